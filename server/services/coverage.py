@@ -1,85 +1,379 @@
 import os
-import subprocess
 import tempfile
-import sys
-import json
 import shutil
+import sys
+import io
+import contextlib
+import threading
+import multiprocessing
+import multiprocessing.util
+import hashlib
+import functools
+import types
+import ast
+import re
+import builtins
+from collections import OrderedDict
+
+import coverage
+import pytest
+
+# coverage.py tracing, sys.path/sys.modules and stdout redirection are all
+# process-global, so only one in-process run may be active at a time.
+_RUN_LOCK = threading.Lock()
+
+# Results keyed by a digest of (source, tests, filename); the improvement loop
+# often re-submits an identical pair, and a run is by far the dominant cost.
+_CACHE_SIZE = 256
+_coverage_cache = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+# Module names AI/AST-generated tests use for the code under test
+_IMPORT_RE = re.compile(r"\bfrom (?:main_module|uploaded|source) import\b")
+
+# Generated tests only need pytest itself. Skipping setuptools entry-point plugin
+# discovery, warning capture and traceback formatting trims every run.
+_PYTEST_ARGS = ["-q", "--no-header", "--tb=no", "-p", "no:cacheprovider", "-p", "no:warnings"]
+
+# Same limit the old `coverage run` subprocess had, counted from when a worker
+# starts the run (time queued behind other requests doesn't count)
+RUN_TIMEOUT = 20
+
+_real_open = builtins.open
+
+def _open_fds() -> frozenset:
+    """Descriptors currently open in this process."""
+    try:
+        candidates = [int(name) for name in os.listdir("/proc/self/fd")]
+    except OSError:
+        candidates = range(256)
+    fds = set()
+    for fd in candidates:
+        try:
+            os.fstat(fd)
+        except OSError:
+            # e.g. the descriptor listdir itself used
+            continue
+        fds.add(fd)
+    return frozenset(fds)
+
+class _FdGuardPlugin:
+    """
+    pytest plugin guarding the worker's own descriptors while each test body runs.
+
+    Edge-case generation passes ints as paths (open(1, 'r'), open(10, 'w')). In a
+    throwaway subprocess that was harmless; here closing the file would close a
+    descriptor the pool worker or pytest's capture still uses, so those get
+    os.devnull instead. Descriptors the code under test opens itself (mkstemp,
+    os.pipe) are opened for real.
+    """
 
-def run_coverage_analysis_logic(source_code: str, test_code: str, filename: str):
+    def _guarded_open(self, file, *args, **kwargs):
+        if isinstance(file, int) and file in self._owned:
+            file = os.devnull
+            kwargs.pop("closefd", None)
+        return _real_open(file, *args, **kwargs)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        self._owned = _open_fds()
+        builtins.open = self._guarded_open
+        try:
+            yield
+        finally:
+            builtins.open = _real_open
+
+def run_coverage_analysis_logic(source_code: str, test_code: str, filename: str, pool: "CoveragePool"):
     """
     Runs tests against source code in a isolated environment and returns coverage.
+    Identical inputs are served from a bounded in-memory cache; otherwise the run
+    happens on one of the pool's workers, which also enforces RUN_TIMEOUT.
+    """
+    key = hashlib.blake2b("\0".join((source_code, test_code, filename)).encode("utf-8")).digest()
+    with _CACHE_LOCK:
+        if key in _coverage_cache:
+            _coverage_cache.move_to_end(key)
+            return dict(_coverage_cache[key])
+
+    result = pool.run(source_code, test_code, filename)
+
+    # Errors may be transient (e.g. a locked temp dir), so only successes are kept
+    if "error" not in result:
+        with _CACHE_LOCK:
+            _coverage_cache[key] = result
+            if len(_coverage_cache) > _CACHE_SIZE:
+                _coverage_cache.popitem(last=False)
+    return dict(result)
+
+def _worker_main(conn, scratch_path: str):
+    """Serve runs sent by the parent until it closes the pipe."""
+    _scratch.path = scratch_path
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        conn.send(_run_coverage(*job))
+
+class _Worker:
+    def __init__(self, ctx):
+        self.scratch_path = _new_scratch_dir()
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, self.scratch_path), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        shutil.rmtree(self.scratch_path, ignore_errors=True)
+
+class CoveragePool:
+    """
+    Persistent worker processes that keep coverage/pytest imported between runs
+    and isolate generated tests from the server. A run has its worker to itself,
+    so one that overruns RUN_TIMEOUT (or takes its interpreter down) costs only
+    that worker, which is replaced on demand.
+    """
+
+    def __init__(self, size: int):
+        # spawn (not fork): the server is multi-threaded, and it matches Windows behaviour
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def run(self, source_code: str, test_code: str, filename: str) -> dict:
+        with self._slots:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                worker = _Worker(self._ctx)
+            try:
+                worker.conn.send((source_code, test_code, filename))
+                # The clock starts once this run has a worker, not when it was queued
+                if worker.conn.poll(RUN_TIMEOUT):
+                    result = worker.conn.recv()
+                    self._release(worker)
+                    return result
+                error = "Coverage run timed out."
+            except (EOFError, OSError):
+                # e.g. generated code called os._exit()
+                error = "Coverage worker exited unexpectedly."
+            worker.kill()
+            return {"coverage_percent": 0.0, "missing_lines": [], "error": error}
+
+    def _release(self, worker: _Worker):
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        worker.kill()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+_scratch = threading.local()
+
+def _new_scratch_dir() -> str:
+    """
+    Private (0700, unpredictable name) directory on tmpfs (/dev/shm) where
+    available, so the files never hit a disk.
+    """
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="ai4se-", dir=base)
+
+def _scratch_dir() -> str:
+    """
+    Per-thread scratch directory reused across runs instead of a fresh temp dir.
+    Pool workers are handed theirs by the parent, which removes it even if the
+    worker is killed.
+    """
+    path = getattr(_scratch, "path", None)
+    if path is None:
+        path = _new_scratch_dir()
+        _scratch.path = path
+        # Unlike atexit, this also runs when a worker process exits
+        multiprocessing.util.Finalize(None, shutil.rmtree, args=(path,), kwargs={"ignore_errors": True}, exitpriority=0)
+    else:
+        # Drop the last run's module, bytecode and any files its tests created
+        for entry in os.scandir(path):
+            if entry.name == "__init__.py":
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+    return path
+
+@functools.lru_cache(maxsize=32)
+def _compile_source(source_text: str, source_path: str):
+    """Compile the uploaded module once; every coverage iteration reuses the code object."""
+    return compile(source_text, source_path, "exec")
+
+# Compiled test files, most recent last. The improvement loop only appends tests,
+# so a new file usually extends one of these and only the appended part is parsed.
+_TEST_CODE_CACHE_SIZE = 16
+_test_code_cache = OrderedDict()
+
+def _compile_tests(test_text: str, test_path: str) -> list:
+    """
+    Return code objects which, executed in order into one namespace, are
+    equivalent to running the whole test file.
+    """
+    key = (test_path, test_text)
+    if key in _test_code_cache:
+        _test_code_cache.move_to_end(key)
+        return _test_code_cache[key]
+
+    chain = _extend_cached_tests(test_text, test_path) or [compile(test_text, test_path, "exec")]
+    _test_code_cache[key] = chain
+    if len(_test_code_cache) > _TEST_CODE_CACHE_SIZE:
+        _test_code_cache.popitem(last=False)
+    return chain
+
+def _extend_cached_tests(test_text: str, test_path: str):
+    """Reuse a cached prefix of test_text, compiling only the new statements after it."""
+    for (path, prefix), chain in reversed(_test_code_cache.items()):
+        if path != test_path or len(prefix) >= len(test_text) or not test_text.startswith(prefix):
+            continue
+        # The split must fall on a line boundary...
+        if not (prefix.endswith("\n") or test_text[len(prefix)] == "\n"):
+            continue
+        try:
+            delta = ast.parse(test_text[len(prefix):], test_path)
+            ast.increment_lineno(delta, prefix.count("\n"))
+            return chain + [compile(delta, test_path, "exec")]
+        except SyntaxError:
+            # ...and the delta must stand alone (not continue a block from the prefix)
+            continue
+    return None
+
+def _preload_module(module_name: str, path: str, code_objects: list):
+    """
+    Execute code objects as a fresh `module_name` module in sys.modules, so the
+    import done by the test (or by pytest's collection) finds it there instead of
+    re-reading and re-compiling the file. On any failure (including a module-level
+    pytest.skip/importorskip) the module is dropped and the normal import reports it.
     """
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # 1. Setup paths
-        source_name = os.path.splitext(filename)[0]
-        # Ensure source_name is a valid python identifier
-        source_name = source_name.replace("-", "_").replace(".", "_")
-        
-        source_path = os.path.join(tmpdir, f"{source_name}.py")
-        test_path = os.path.join(tmpdir, "test_main.py")
-        
-        # 2. Write files
-        with open(source_path, "w", encoding="utf-8") as f:
-            f.write("# -*- coding: utf-8 -*-\n")
-            f.write(source_code)
-            
-        # AI often uses 'from main_module import *' or 'from uploaded import *'
-        # We need to fix the import in test_code to point to source_name
-        adjusted_test_code = test_code.replace("from main_module import", f"from {source_name} import")
-        adjusted_test_code = adjusted_test_code.replace("from uploaded import", f"from {source_name} import")
-        adjusted_test_code = adjusted_test_code.replace("from source import", f"from {source_name} import")
-        
-        # If no import found, we prepend it as a safety measure (risky but better than failing)
-        if f"from {source_name}" not in adjusted_test_code and f"import {source_name}" not in adjusted_test_code:
-            adjusted_test_code = f"from {source_name} import *\n" + adjusted_test_code
-
-        with open(test_path, "w", encoding="utf-8") as f:
-            f.write("# -*- coding: utf-8 -*-\n")
-            f.write(adjusted_test_code)
-            
-        # 3. Create dummy __init__.py to make it a package (optional but helps)
-        with open(os.path.join(tmpdir, "__init__.py"), "w") as f:
+    module = types.ModuleType(module_name)
+    module.__file__ = path
+    module.__package__ = module_name.rpartition(".")[0]
+    sys.modules[module_name] = module
+    try:
+        for code in code_objects:
+            exec(code, module.__dict__)
+    except KeyboardInterrupt:
+        raise
+    except BaseException:
+        del sys.modules[module_name]
+
+def _run_coverage(source_code: str, test_code: str, filename: str):
+    """Uses coverage.py and pytest in-process instead of spawning interpreters."""
+    tmpdir = _scratch_dir()
+
+    # 1. Setup paths
+    source_name = os.path.splitext(filename)[0]
+    # Ensure source_name is a valid python identifier
+    source_name = source_name.replace("-", "_").replace(".", "_")
+    # An upload named json.py must not stand in for the real json (or pytest's own
+    # imports) while the run is active
+    if source_name in sys.modules or source_name in sys.stdlib_module_names:
+        source_name += "_uploaded"
+
+    source_path = os.path.join(tmpdir, f"{source_name}.py")
+    test_path = os.path.join(tmpdir, "test_main.py")
+
+    # 2. Write files
+    # The file is still needed for coverage's line analysis
+    source_text = "# -*- coding: utf-8 -*-\n" + source_code
+    with open(source_path, "w", encoding="utf-8") as f:
+        f.write(source_text)
+
+    # AI often uses 'from main_module import *' or 'from uploaded import *'
+    # We need to fix the import in test_code to point to source_name
+    source_import = f"from {source_name} import"
+    adjusted_test_code = _IMPORT_RE.sub(lambda _: source_import, test_code)
+
+    # If no import found, we prepend it as a safety measure (risky but better than failing)
+    if not re.search(rf"\b(?:from|import) {re.escape(source_name)}\b", adjusted_test_code):
+        adjusted_test_code = f"from {source_name} import *\n" + adjusted_test_code
+
+    # Written for pytest's collection and tracebacks; the module itself is preloaded
+    test_text = "# -*- coding: utf-8 -*-\n" + adjusted_test_code
+    with open(test_path, "w", encoding="utf-8") as f:
+        f.write(test_text)
+
+    # 3. Create dummy __init__.py to make it a package (optional but helps)
+    init_path = os.path.join(tmpdir, "__init__.py")
+    if not os.path.exists(init_path):
+        with open(init_path, "w") as f:
             f.write("")
 
+    with _RUN_LOCK:
+        saved_cwd = os.getcwd()
+        saved_path = list(sys.path)
+        saved_modules = dict(sys.modules)
+        saved_autoload = os.environ.get("PYTEST_DISABLE_PLUGIN_AUTOLOAD")
         try:
-            env = os.environ.copy()
-            env["PYTHONPATH"] = tmpdir
-            
+            os.environ["PYTEST_DISABLE_PLUGIN_AUTOLOAD"] = "1"
+            os.chdir(tmpdir)
+            sys.path.insert(0, tmpdir)
+
             # 4. Run Coverage
-            # coverage run --source=. -m pytest test_main.py
-            cmd_run = [
-                sys.executable, "-m", "coverage", "run",
-                f"--source={source_name}",
-                "-m", "pytest", "test_main.py"
-            ]
-            
-            result = subprocess.run(cmd_run, cwd=tmpdir, env=env, capture_output=True, text=True, timeout=20)
-            
-            # 5. Export JSON
-            cmd_json = [sys.executable, "-m", "coverage", "json", "-o", "cov.json"]
-            subprocess.run(cmd_json, cwd=tmpdir, env=env, capture_output=True)
-            
-            json_path = os.path.join(tmpdir, "cov.json")
-            if os.path.exists(json_path):
-                with open(json_path, "r") as f:
-                    data = json.load(f)
-                    totals = data.get("totals", {})
-                    percent = totals.get("percent_covered", 0.0)
-                    
-                    # Missing lines for the specific source file
-                    missing_lines = []
-                    for fpath, finfo in data.get("files", {}).items():
-                        if source_name in fpath:
-                            missing_lines = finfo.get("missing_lines", [])
-                            break
-                            
-                    return {
-                        "coverage_percent": percent,
-                        "missing_lines": missing_lines,
-                        "report": data
-                    }
-            
-            return {"coverage_percent": 0.0, "missing_lines": [], "error": "Coverage file not generated."}
+            # include= (not source=) so a module name can't collide with server packages
+            cov = coverage.Coverage(include=[source_path], data_file=None)
+            cov.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    # Syntax errors are left for pytest's own import to report
+                    try:
+                        source_module_code = [_compile_source(source_text, source_path)]
+                        test_module_code = _compile_tests(test_text, test_path)
+                    except SyntaxError:
+                        pass
+                    else:
+                        _preload_module(source_name, source_path, source_module_code)
+                        # pytest names the test module after the package it sits in (the scratch dir)
+                        _preload_module(f"{os.path.basename(tmpdir)}.test_main", test_path, test_module_code)
+                    pytest.main([*_PYTEST_ARGS, test_path], plugins=[_FdGuardPlugin()])
+            except Exception:
+                # A test that breaks pytest's own teardown shouldn't discard
+                # the coverage data that was already collected
+                pass
+            finally:
+                cov.stop()
+
+            # 5. Read results straight from the collected data (no JSON export)
+            _, executable, _, missing_lines, _ = cov.analysis2(source_path)
+            percent = 100.0 * (len(executable) - len(missing_lines)) / len(executable) if executable else 100.0
+
+            return {
+                "coverage_percent": percent,
+                "missing_lines": missing_lines,
+                "total_statements": len(executable)
+            }
 
         except Exception as e:
             return {"coverage_percent": 0.0, "missing_lines": [], "error": str(e)}
+        finally:
+            # Restore the sys.modules snapshot: drop the uploaded/test modules (and
+            # anything they imported) so the next run imports fresh copies, and put
+            # back any entry the run replaced
+            os.chdir(saved_cwd)
+            if saved_autoload is None:
+                del os.environ["PYTEST_DISABLE_PLUGIN_AUTOLOAD"]
+            else:
+                os.environ["PYTEST_DISABLE_PLUGIN_AUTOLOAD"] = saved_autoload
+            sys.path[:] = saved_path
+            for name in sys.modules.keys() - saved_modules.keys():
+                del sys.modules[name]
+            for name, module in saved_modules.items():
+                if sys.modules.get(name) is not module:
+                    sys.modules[name] = module
@@ -1,21 +1,55 @@
 import os
-import google.generativeai as genai
-from typing import Dict, List, Optional
+import re
+import functools
+from typing import Dict
 import json
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json works the same here
+    orjson = None
+
+def _json_loads(text: str):
+    return orjson.loads(text) if orjson else json.loads(text)
+
+def _json_dumps_indented(obj) -> str:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+_genai = None
+
+def _get_genai():
+    """Import google.generativeai on first use - it pulls in gRPC/protobuf, which the AST-only path never needs."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        _genai = genai
+    return _genai
+
+_ROOT_ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.env')
+_gemini_ready = False
+
 # Initialize Gemini API
 def initialize_gemini() -> bool:
-    """Initialize Gemini API with API key from environment."""
+    """
+    Initialize Gemini API with API key from environment.
+    Only a successful init is remembered, so a key added to .env later or a
+    transient configure error doesn't disable Gemini until restart.
+    """
+    global _gemini_ready
+    if _gemini_ready:
+        return True
     try:
         # Load .env from root directory
-        root_env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.env')
-        load_dotenv(dotenv_path=root_env_path)
-        
+        load_dotenv(dotenv_path=_ROOT_ENV_PATH)
+
         api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
             return False
-        genai.configure(api_key=api_key)
+        _get_genai().configure(api_key=api_key)
+        _gemini_ready = True
         return True
     except Exception as e:
         print(f"Gemini initialization error: {e}")
@@ -23,24 +57,210 @@ def initialize_gemini() -> bool:
 
 import time
 import random
+import threading
+from concurrent.futures import Future
+
+@functools.lru_cache(maxsize=8)
+def _get_model(model_name: str, **generation_config):
+    """Build each (model, generation config) pair once and reuse it across requests."""
+    return _get_genai().GenerativeModel(model_name, generation_config=generation_config or None)
+
+def _is_rate_limited(e: Exception) -> bool:
+    # google.api_core's ResourceExhausted carries code 429 (HTTPStatus compares equal to int);
+    # reading it avoids formatting the whole gRPC error just to search it for "429"
+    return getattr(e, "code", None) == 429
+
+class _RetryBucket:
+    """
+    Token bucket shared by every request thread, so that after a 429 the retries
+    are spread out at `rate` per second instead of all hitting the API together.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def next_delay(self) -> float:
+        """Reserve a retry slot and return how long to wait for it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def release(self):
+        """Give back a reserved slot that won't be used."""
+        with self.lock:
+            self.tokens += 1
+
+_RETRY_BASE_DELAY = 2.0
+# Rather fail than park a request thread longer than this behind other retries
+_RETRY_MAX_DELAY = 10.0
+_retry_bucket = _RetryBucket(rate=1 / _RETRY_BASE_DELAY)
 
 def _generate_with_retry(model, prompt, **kwargs):
-    """Helper to retry API calls on rate limit errors."""
-    max_retries = 1 
-    base_delay = 2.0
-    
-    for attempt in range(max_retries + 1):
+    """Helper to retry API calls (once) on rate limit errors."""
+    try:
+        return model.generate_content(prompt, **kwargs)
+    except Exception as e:
+        if not _is_rate_limited(e):
+            raise
+        delay = _RETRY_BASE_DELAY + _retry_bucket.next_delay()
+        if delay > _RETRY_MAX_DELAY:
+            _retry_bucket.release()
+            raise
+        time.sleep(delay + random.uniform(0, 1))
+        return model.generate_content(prompt, **kwargs)
+
+# First fenced block (```json / ```python / bare ```); an unclosed fence from a
+# truncated response runs to the end of the text
+_FENCE_RE = re.compile(r"```(?:json|python|py)?[ \t]*\n?(.*?)(?:```|\Z)", re.DOTALL)
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+def _strip_fences(text: str) -> str:
+    """Return the code inside the first markdown fence, or the text itself if there is none."""
+    m = _FENCE_RE.search(text)
+    return m.group(1).strip() if m else text.strip()
+
+def _extract_json(text: str):
+    """Parse the JSON object from a model response, ignoring fences and chatter around it."""
+    text = _strip_fences(text)
+    m = _JSON_RE.search(text)
+    return _json_loads(m.group(0) if m else text)
+
+def _stream_text(model, prompt, until_json=False, **kwargs) -> str:
+    """
+    Stream the response and join its chunks. With until_json, stop reading as soon
+    as the text holds a complete JSON object, skipping any trailing chatter.
+    """
+    parts = []
+    for chunk in _generate_with_retry(model, prompt, stream=True, **kwargs):
         try:
-            return model.generate_content(prompt, **kwargs)
+            parts.append(chunk.text)
+        except ValueError:
+            # Chunk without text parts (e.g. the final finish_reason chunk)
+            continue
+        # Only a chunk bringing a "}" can complete the object. (Counting braces
+        # instead would be fooled by braces inside JSON strings.)
+        if until_json and "}" in parts[-1]:
+            text = "".join(parts)
+            try:
+                _extract_json(text)
+                return text
+            except ValueError:
+                pass
+    return "".join(parts)
+
+# In-flight calls keyed by (model, prompt, options); see _generate_text
+_inflight = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+def _generate_text(model, prompt, **kwargs) -> str:
+    """
+    Response text for prompt. Identical concurrent requests (same cached model,
+    prompt and options - e.g. a double-submitted analysis) share a single Gemini
+    round trip instead of each paying for one.
+    """
+    key = (id(model), prompt, repr(sorted(kwargs.items())))
+    with _INFLIGHT_LOCK:
+        future = _inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = _inflight[key] = Future()
+
+    if is_owner:
+        try:
+            future.set_result(_stream_text(model, prompt, **kwargs))
         except Exception as e:
-            if "429" in str(e) or "quota" in str(e).lower():
-                if attempt < max_retries:
-                    delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
-                
-                    time.sleep(delay)
-                    continue
-            raise e
+            future.set_exception(e)
+        finally:
+            with _INFLIGHT_LOCK:
+                del _inflight[key]
+    return future.result()
+
+
+# Prompt templates, filled with str.format_map (literal braces are doubled)
+_PROMPT_ANALYZE_CODE = """Analyze this Python code and return ONLY a valid JSON object (no markdown, no code blocks):
+
+{code}
+
+Return this exact JSON structure:
+{{"complexity_score": 5, "testability_score": 7, "issues": ["issue1"], "strengths": ["strength1"], "test_recommendations": ["rec1"]}}
+
+IMPORTANT: Return ONLY the JSON object, nothing else."""
+
+_PROMPT_ANALYZE_COVERAGE = """Analyze this test coverage situation:
+
+**Source Code:**
+```python
+{source_code}
+```
+
+**Current Tests:**
+```python
+{test_code}
+```
+
+**Coverage Stats:**
+- Coverage: {coverage_pct}%
+- Missing lines: {missing_lines}
+
+Provide a JSON response with:
+1. "coverage_assessment": overall quality assessment
+2. "missing_scenarios": list of untested scenarios
+3. "improvement_suggestions": specific suggestions to increase coverage
+4. "priority_areas": which parts need testing most urgently
+
+Return ONLY valid JSON, no markdown formatting."""
+
+_PROMPT_SMART_TESTS = """Generate pytest tests for:
+
+```{language}
+{source_code}  
+```
+
+Generate concise tests covering main functions, edge cases, and errors. Target >90% coverage.
+
+Return Python code only."""
+
+_PROMPT_IMPROVE_TESTS = """Improve these pytest tests to increase coverage:
+
+**Source Code:**
+```python
+{source_code}
+```
+
+**Current Tests:**
+```python
+{current_tests}
+```
+
+**Missing Scenarios:**
+{missing_scenarios}
+
+**Improvement Suggestions:**
+{suggestions}
+
+Add new test cases to cover the missing scenarios. Return ONLY the complete improved test code, no explanations."""
+
+_PROMPT_DIRECT_TESTS = """Generate comprehensive pytest tests for this Python code to achieve 90%+ coverage.
+
+CODE:
+{source_code}
+
+REQUIREMENTS:
+- Use pytest; pytest.mark.parametrize for small case tables (up to 20 cases), a plain for loop with assert messages inside one test for larger ones
+- Test all functions thoroughly
+- Include edge cases, boundary conditions, error handling
+- Test all branches and conditions
+- Aim for 90%+ code coverage
+- Return ONLY the Python test code, no explanations
 
+Generate the complete test file now:"""
 
 def analyze_code_quality(source_code: str, language: str = "python") -> Dict:
     """
@@ -51,66 +271,27 @@ def analyze_code_quality(source_code: str, language: str = "python") -> Dict:
         return {"error": "Gemini API not configured"}
     
     try:
-        model = genai.GenerativeModel(
+        model = _get_model(
             'models/gemini-2.5-flash',
-            generation_config={
-                'temperature': 0.2,
-                'max_output_tokens': 512,
-                'top_p': 0.8
-            }
+            temperature=0.2,
+            max_output_tokens=512,
+            top_p=0.8
         )
         
         # Limit code length for faster analysis
-        code_snippet = source_code[:800] if len(source_code) > 800 else source_code
+        code_snippet = source_code[:800]
         
-        prompt = f"""Analyze this Python code and return ONLY a valid JSON object (no markdown, no code blocks):
-
-{code_snippet}
-
-Return this exact JSON structure:
-{{"complexity_score": 5, "testability_score": 7, "issues": ["issue1"], "strengths": ["strength1"], "test_recommendations": ["rec1"]}}
-
-IMPORTANT: Return ONLY the JSON object, nothing else."""
+        prompt = _PROMPT_ANALYZE_CODE.format_map({'code': code_snippet})
 
-        response = _generate_with_retry(
+        response_text = _generate_text(
             model,
             prompt,
+            until_json=True,
             request_options={'timeout': 20}
         )
         
         # Parse JSON from response
-        result_text = response.text.strip()
-        
-        # Remove any markdown formatting
-        if '```' in result_text:
-            # Extract content between code blocks
-            parts = result_text.split('```')
-            for part in parts:
-                part = part.strip()
-                if part.startswith('json'):
-                    result_text = part[4:].strip()
-                elif part.startswith('{'):
-                    result_text = part
-                    break
-        
-        # Find JSON object
-        if '{' in result_text:
-            start = result_text.index('{')
-            end = result_text.rindex('}') + 1
-            result_text = result_text[start:end]
-        
-        analysis = json.loads(result_text)
-        return analysis
-        
-        # Parse JSON from response
-        result_text = response.text.strip()
-        # Remove markdown code blocks if present
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
-        
-        analysis = json.loads(result_text)
+        analysis = _extract_json(response_text)
         return analysis
         
     except Exception as e:
@@ -125,44 +306,21 @@ def analyze_test_coverage(source_code: str, test_code: str, coverage_data: Dict)
         return {"error": "Gemini API not configured"}
     
     try:
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
+        model = _get_model('models/gemini-2.5-flash')
         
         coverage_pct = coverage_data.get("coverage_percent", 0)
         missing_lines = coverage_data.get("missing_lines", [])
         
-        prompt = f"""Analyze this test coverage situation:
-
-**Source Code:**
-```python
-{source_code}
-```
-
-**Current Tests:**
-```python
-{test_code}
-```
-
-**Coverage Stats:**
-- Coverage: {coverage_pct}%
-- Missing lines: {missing_lines}
-
-Provide a JSON response with:
-1. "coverage_assessment": overall quality assessment
-2. "missing_scenarios": list of untested scenarios
-3. "improvement_suggestions": specific suggestions to increase coverage
-4. "priority_areas": which parts need testing most urgently
+        prompt = _PROMPT_ANALYZE_COVERAGE.format_map({
+            'source_code': source_code,
+            'test_code': test_code,
+            'coverage_pct': coverage_pct,
+            'missing_lines': missing_lines,
+        })
 
-Return ONLY valid JSON, no markdown formatting."""
-
-        response = _generate_with_retry(model, prompt)
-        
-        result_text = response.text.strip()
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
+        response_text = _generate_text(model, prompt, until_json=True)
         
-        analysis = json.loads(result_text)
+        analysis = _extract_json(response_text)
         return analysis
         
     except Exception as e:
@@ -176,37 +334,23 @@ def generate_smart_tests(source_code: str, code_analysis: Dict, language: str =
         return "# Gemini API not configured", "Error: API not available"
     
     try:
-        model = genai.GenerativeModel(
+        model = _get_model(
             'models/gemini-pro',
-            generation_config={
-                'temperature': 0.3,  # Lower for faster, more focused responses
-                'max_output_tokens': 2048,  # Limit output length
-                'top_p': 0.8,
-                'top_k': 20
-            }
+            temperature=0.3,  # Lower for faster, more focused responses
+            max_output_tokens=2048,  # Limit output length
+            top_p=0.8,
+            top_k=20
         )
         
-        prompt = f"""Generate pytest tests for:
-
-```{language}
-{source_code[:1000]}  
-```
-
-Generate concise tests covering main functions, edge cases, and errors. Target >90% coverage.
-
-Return Python code only."""
+        prompt = _PROMPT_SMART_TESTS.format_map({'language': language, 'source_code': source_code[:1000]})
 
-        response = _generate_with_retry(
+        response_text = _generate_text(
             model,
             prompt,
             request_options={'timeout': 30}  # 30 second timeout
         )
-        test_code = response.text.strip()
-        
         # Remove markdown code blocks if present
-        if test_code.startswith("```"):
-            lines = test_code.split("\n")
-            test_code = "\n".join(lines[1:-1]) if len(lines) > 2 else test_code
+        test_code = _strip_fences(response_text)
         
         explanation = f"Generated AI-powered tests based on code analysis (complexity: {code_analysis.get('complexity_score', 'N/A')})"
         
@@ -223,38 +367,21 @@ def improve_tests_with_ai(source_code: str, current_tests: str, coverage_analysi
         return current_tests, "Error: Gemini API not configured"
     
     try:
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
+        model = _get_model('models/gemini-2.5-flash')
         
         missing_scenarios = coverage_analysis.get("missing_scenarios", [])
         suggestions = coverage_analysis.get("improvement_suggestions", [])
         
-        prompt = f"""Improve these pytest tests to increase coverage:
-
-**Source Code:**
-```python
-{source_code}
-```
-
-**Current Tests:**
-```python
-{current_tests}
-```
+        prompt = _PROMPT_IMPROVE_TESTS.format_map({
+            'source_code': source_code,
+            'current_tests': current_tests,
+            'missing_scenarios': _json_dumps_indented(missing_scenarios),
+            'suggestions': _json_dumps_indented(suggestions),
+        })
 
-**Missing Scenarios:**
-{json.dumps(missing_scenarios, indent=2)}
-
-**Improvement Suggestions:**
-{json.dumps(suggestions, indent=2)}
-
-Add new test cases to cover the missing scenarios. Return ONLY the complete improved test code, no explanations."""
-
-        response = _generate_with_retry(model, prompt)
-        improved_tests = response.text.strip()
-        
+        response_text = _generate_text(model, prompt)
         # Remove markdown code blocks if present
-        if improved_tests.startswith("```"):
-            lines = improved_tests.split("\n")
-            improved_tests = "\n".join(lines[1:-1]) if len(lines) > 2 else improved_tests
+        improved_tests = _strip_fences(response_text)
         
         explanation = f"Added tests for {len(missing_scenarios)} missing scenarios"
         
@@ -267,7 +394,7 @@ def get_ai_status() -> Dict:
     """Check Gemini API connection status."""
     if initialize_gemini():
         try:
-            model = genai.GenerativeModel('models/gemini-2.5-flash')
+            model = _get_model('models/gemini-2.5-flash')
             response = model.generate_content("Say 'OK' if you can read this.")
             return {
                 "status": "connected",
@@ -288,47 +415,23 @@ def generate_tests_directly(source_code: str, language: str = "python") -> tuple
         return "# Gemini API not configured", "Error: API not available"
     
     try:
-        model = genai.GenerativeModel(
+        model = _get_model(
             'models/gemini-2.5-flash',
-            generation_config={
-                'temperature': 0.4,
-                'max_output_tokens': 3000,
-                'top_p': 0.9
-            }
+            temperature=0.4,
+            max_output_tokens=3000,
+            top_p=0.9
         )
         
-        prompt = f"""Generate comprehensive pytest tests for this Python code to achieve 90%+ coverage.
-
-CODE:
-{source_code}
+        prompt = _PROMPT_DIRECT_TESTS.format_map({'source_code': source_code})
 
-REQUIREMENTS:
-- Use pytest and pytest.mark.parametrize
-- Test all functions thoroughly
-- Include edge cases, boundary conditions, error handling
-- Test all branches and conditions
-- Aim for 90%+ code coverage
-- Return ONLY the Python test code, no explanations
-
-Generate the complete test file now:"""
-
-        response = _generate_with_retry(
+        response_text = _generate_text(
             model,
             prompt,
             request_options={'timeout': 45}
         )
         
-        test_code = response.text.strip()
-        
         # Clean up markdown if present
-        if '```python' in test_code:
-            parts = test_code.split('```python')
-            if len(parts) > 1:
-                test_code = parts[1].split('```')[0].strip()
-        elif '```' in test_code:
-            parts = test_code.split('```')
-            if len(parts) >= 3:
-                test_code = parts[1].strip()
+        test_code = _strip_fences(response_text)
         
         # Ensure it starts with import
         if not test_code.startswith('import'):
@@ -1,21 +1,56 @@
 import os
 import ast
 import inspect
+import functools
+import itertools
+import re
+import io
+import sys
+from collections import deque
+from typing import Optional, TextIO
+
+_gemini = None
+
+def _get_gemini():
+    """services.gemini_analyzer, imported on first AI use and then kept."""
+    global _gemini
+    if _gemini is None:
+        from services import gemini_analyzer
+        _gemini = gemini_analyzer
+    return _gemini
+
+def _keyword_re(*keywords):
+    """Compiled substring alternation for a fixed keyword group."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+# Keyword tuple -> compiled alternation, built on first use
+_KEYWORD_RES = {}
+
+def _has_any(text: str, keywords: tuple) -> bool:
+    """True if any keyword is a substring of text (one regex scan instead of a loop of `in` checks)."""
+    rx = _KEYWORD_RES.get(keywords)
+    if rx is None:
+        rx = _KEYWORD_RES[keywords] = _keyword_re(*keywords)
+    return rx.search(text) is not None
 
 def analyze_code_structure(source_code: str) -> dict:
     """
     Advanced AST analysis to extract functions, classes, parameters, branches, and test requirements.
     Detects parameter types, string literals, comparisons, and all code paths.
     Also detects class methods and associates them with their parent class.
+    Results are cached per source text and shared, so callers must not mutate them
+    (beyond the derived fields _prime_func_info adds).
     """
+    return _analyze_code_structure(source_code)
+
+# Generation and every improvement pass analyze the same upload
+@functools.lru_cache(maxsize=128)
+def _analyze_code_structure(source_code: str) -> dict:
     try:
         tree = ast.parse(source_code)
         
-        # FIX 1: Link parents for advanced inference
-        for parent in ast.walk(tree):
-            for child in ast.iter_child_nodes(parent):
-                child.parent = parent
-                
+        # No parent links needed: parameter usage is read off the Subscript/Call
+        # node itself while _analyze_function walks the body
         functions = []
         classes = []
         
@@ -51,9 +86,10 @@ def analyze_code_structure(source_code: str) -> dict:
                 func_info['class_name'] = None
                 functions.append(func_info)
         
-        return {'functions': functions, 'classes': classes}
+        # Built once here since every generated argument may look a class up by name
+        return {'functions': functions, 'classes': classes, 'classes_by_name': _index_classes(classes)}
     except Exception as e:
-        return {'functions': [], 'classes': [], 'error': str(e)}
+        return {'functions': [], 'classes': [], 'classes_by_name': {}, 'error': str(e)}
 
 def _analyze_function(node: ast.FunctionDef) -> dict:
     """Analyze a single function or method."""
@@ -63,164 +99,579 @@ def _analyze_function(node: ast.FunctionDef) -> dict:
         'lineno': node.lineno,
         'end_lineno': getattr(node, 'end_lineno', -1),
         'param_types': {},
-        'string_literals': set(),
+        'string_literals': {},
         'comparisons': [],
-        'dict_keys': set(),
+        'dict_keys': {},
         'body_indicators': set(),
         'has_if': False,
         'has_loops': False,
         'has_try': False,
-        'returns': [],
+        'return_count': 0,
         'branches': 0,
         'conditions': []
     }
     
-    # Analyze function body
-    for child in ast.walk(node):
-        # Detect dictionary usage: var['key']
-        if isinstance(child, ast.Subscript) and isinstance(child.slice, ast.Constant):
-            if isinstance(child.slice.value, str):
-                func_info['dict_keys'].add(child.slice.value)
-                
-        # Detect dictionary usage: var.get('key')
-        elif isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute):
-            if child.func.attr == 'get' and child.args:
-                if isinstance(child.args[0], ast.Constant) and isinstance(child.args[0].value, str):
-                    func_info['dict_keys'].add(child.args[0].value)
-
-        # Detect if statements and extract conditions
-        if isinstance(child, ast.If):
-            func_info['has_if'] = True
-            func_info['branches'] += 1
-            condition_info = _extract_condition(child.test)
-            if condition_info:
-                func_info['conditions'].append(condition_info)
-        
-        # Detect loops
-        elif isinstance(child, (ast.For, ast.While)):
-            func_info['has_loops'] = True
-            func_info['branches'] += 1
-        
-        # Detect try-except
-        elif isinstance(child, ast.Try):
-            func_info['has_try'] = True
-        
-        # Detect return statements
-        elif isinstance(child, ast.Return):
-            func_info['returns'].append(True)
-        
-        # Extract string literals (for enum-like values)
-        elif isinstance(child, ast.Constant) and isinstance(child.value, str):
-            func_info['string_literals'].add(child.value)
-        
-        # Extract comparisons
-        elif isinstance(child, ast.Compare):
-            comp_info = _extract_comparison(child)
-            if comp_info:
-                func_info['comparisons'].append(comp_info)
-        
-        # Detect body indicators (file vs dir ops)
-        elif isinstance(child, ast.Call):
-            if isinstance(child.func, ast.Name) and child.func.id == 'open':
-                func_info['body_indicators'].add('file_op')
-            elif isinstance(child.func, ast.Attribute):
-                attr = child.func.attr
-                if attr in ['walk', 'listdir', 'scandir', 'mkdir', 'makedirs', 'rmdir']:
-                    func_info['body_indicators'].add('dir_op')
-                elif attr in ['read', 'write', 'readlines', 'unlink', 'remove']:
-                    func_info['body_indicators'].add('file_op')
+    # Analyze function body - one breadth-first walk (same order as ast.walk),
+    # dispatching on the exact node type. Nested defs and classes are their own
+    # scope: their branches and literals don't belong to this function.
+    params = set(func_info['args'])
+    usage_types = {}
+    todo = deque([node])
+    push = todo.append
+    AST = ast.AST
+    while todo:
+        child = todo.popleft()
+        handler = _NODE_HANDLERS.get(type(child))
+        if handler:
+            handler(child, func_info, params, usage_types)
+        # ast.iter_child_nodes inlined: no generator per node
+        for field in child._fields:
+            value = getattr(child, field, None)
+            if type(value) is list:
+                for c in value:
+                    if isinstance(c, AST) and type(c) not in _NESTED_SCOPES:
+                        push(c)
+            elif isinstance(value, AST) and type(value) not in _NESTED_SCOPES:
+                push(value)
     
-    # Infer parameter types from usage
-    func_info['param_types'] = _infer_parameter_types(node, func_info['args'])
+    # Infer parameter types from naming, falling back to the usage seen above
+    func_info['param_types'] = _infer_parameter_types(func_info['args'], usage_types)
+    
+    # Collected into dicts (ordered sets) during the walk; consumers only iterate
+    # them, so hand out compact tuples in first-seen order
+    func_info['string_literals'] = tuple(func_info['string_literals'])
+    func_info['dict_keys'] = tuple(func_info['dict_keys'])
     
     return func_info
 
+def _note_param_usage(node, params: set, usage_types: dict, param_type: str):
+    """Record param_type for each parameter used directly inside node (first use wins)."""
+    for child in ast.iter_child_nodes(node):
+        if type(child) is ast.Name and child.id in params:
+            usage_types.setdefault(child.id, param_type)
+
+# Method names that mark a function as a directory / file utility, or a
+# parameter passed to them as a dict
+_DIR_OP_ATTRS = frozenset({'walk', 'listdir', 'scandir', 'mkdir', 'makedirs', 'rmdir'})
+_FILE_OP_ATTRS = frozenset({'read', 'write', 'readlines', 'unlink', 'remove'})
+_DICT_ACCESS_ATTRS = frozenset({'get', 'keys', 'values'})
+
+def _h_subscript(child, func_info, params, usage_types):
+    # Detect dictionary usage: var['key']
+    if isinstance(child.slice, ast.Constant) and isinstance(child.slice.value, str):
+        func_info['dict_keys'][sys.intern(child.slice.value)] = None
+    # param[...] or x[param]
+    _note_param_usage(child, params, usage_types, 'list')
+
+def _h_call(child, func_info, params, usage_types):
+    func = child.func
+    if isinstance(func, ast.Attribute):
+        attr = func.attr
+        # Detect dictionary usage: var.get('key')
+        if attr == 'get' and child.args:
+            if isinstance(child.args[0], ast.Constant) and isinstance(child.args[0].value, str):
+                func_info['dict_keys'][sys.intern(child.args[0].value)] = None
+        # Detect body indicators (file vs dir ops)
+        if attr in _DIR_OP_ATTRS:
+            func_info['body_indicators'].add('dir_op')
+        elif attr in _FILE_OP_ATTRS:
+            func_info['body_indicators'].add('file_op')
+        # x.get(param) and friends
+        if attr in _DICT_ACCESS_ATTRS:
+            _note_param_usage(child, params, usage_types, 'dict')
+    elif isinstance(func, ast.Name) and func.id == 'open':
+        func_info['body_indicators'].add('file_op')
+
+def _h_if(child, func_info, params, usage_types):
+    # Detect if statements and extract conditions
+    func_info['has_if'] = True
+    func_info['branches'] += 1
+    condition_info = _extract_condition(child.test)
+    if condition_info:
+        func_info['conditions'].append(condition_info)
+
+def _h_loop(child, func_info, params, usage_types):
+    func_info['has_loops'] = True
+    func_info['branches'] += 1
+
+def _h_try(child, func_info, params, usage_types):
+    func_info['has_try'] = True
+
+def _h_return(child, func_info, params, usage_types):
+    func_info['return_count'] += 1
+
+def _h_constant(child, func_info, params, usage_types):
+    # Extract string literals (for enum-like values). Interned so the copies of
+    # e.g. 'price' in every method of a class share one object.
+    if isinstance(child.value, str):
+        func_info['string_literals'][sys.intern(child.value)] = None
+
+def _h_compare(child, func_info, params, usage_types):
+    comp_info = _extract_comparison(child)
+    if comp_info:
+        func_info['comparisons'].append(comp_info)
+
+_NESTED_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+_NODE_HANDLERS = {
+    ast.Subscript: _h_subscript,
+    ast.Call: _h_call,
+    ast.If: _h_if,
+    ast.For: _h_loop,
+    ast.While: _h_loop,
+    ast.Try: _h_try,
+    ast.Return: _h_return,
+    ast.Constant: _h_constant,
+    ast.Compare: _h_compare,
+}
+
+def _index_classes(classes: list) -> dict:
+    """Index classes by name; the first definition wins, as with a linear search."""
+    return {c['name']: c for c in reversed(classes)}
+
+def _classes_by_name(analysis: dict) -> dict:
+    """analysis['classes'] by name (prebuilt by analyze_code_structure)."""
+    index = analysis.get('classes_by_name')
+    return index if index is not None else _index_classes(analysis.get('classes', []))
+
 def _extract_condition(test_node) -> dict:
     """Extract condition details from if statement."""
-    try:
-        if isinstance(test_node, ast.Compare):
-            left = ast.unparse(test_node.left) if hasattr(ast, 'unparse') else 'unknown'
-            ops = [type(op).__name__ for op in test_node.ops]
-            comparators = [ast.unparse(c) if hasattr(ast, 'unparse') else 'unknown' for c in test_node.comparators]
-            return {'left': left, 'ops': ops, 'comparators': comparators}
-        elif isinstance(test_node, ast.BoolOp):
-            return {'type': 'BoolOp', 'op': type(test_node.op).__name__}
-    except:
-        pass
+    if isinstance(test_node, ast.Compare):
+        return _extract_comparison(test_node)
+    elif isinstance(test_node, ast.BoolOp):
+        return {'type': 'BoolOp', 'op': type(test_node.op).__name__}
     return None
 
 def _extract_comparison(comp_node) -> dict:
     """Extract comparison operation details."""
-    try:
-        left = ast.unparse(comp_node.left) if hasattr(ast, 'unparse') else 'unknown'
-        ops = [type(op).__name__ for op in comp_node.ops]
-        comparators = [ast.unparse(c) if hasattr(ast, 'unparse') else 'unknown' for c in comp_node.comparators]
-        return {'left': left, 'ops': ops, 'comparators': comparators}
-    except:
-        pass
-    return None
+    return {'node': comp_node, 'ops': [type(op).__name__ for op in comp_node.ops]}
+
+# Substring rules, checked in order. 'n' makes the int rule match any name containing an n.
+_PARAM_NAME_RULES = [
+    (re.compile(r'price|cost|amount|total|discount'), 'float'),
+    (re.compile(r'count|quantity|num|n|index'), 'int'),
+    (re.compile(r'name|type|code|country|status'), 'str'),
+    (re.compile(r'items|list|arr|numbers'), 'list'),
+    (re.compile(r'is_|has_|can_'), 'bool'),
+]
+_PARAM_EXACT_TYPES = {'data': 'dict', 'config': 'dict', 'options': 'dict'}
 
-def _infer_parameter_types(func_node, param_names: list) -> dict:
+def _infer_parameter_types(param_names: list, usage_types: dict) -> dict:
     """
     Infer parameter types from how they're used in the function.
+    usage_types holds what _analyze_function's walk saw the parameter used as.
     Returns dict mapping param_name -> inferred_type
     """
     param_types = {}
     
     for param in param_names:
-        param_lower = param.lower()
+        # Naming patterns first, then usage in the function body, default to generic
+        param_types[param] = _param_name_type(param) or usage_types.get(param, 'any')
+    
+    return param_types
+
+# Parameter names repeat heavily across functions, so the rules run once per name
+@functools.lru_cache(maxsize=4096)
+def _param_name_type(param: str) -> Optional[str]:
+    """Type implied by a parameter's name alone, or None."""
+    param_lower = param.lower()
+    # Check for common naming patterns (first matching rule wins)
+    param_type = next((t for rx, t in _PARAM_NAME_RULES if rx.search(param_lower)), None)
+    return param_type or _PARAM_EXACT_TYPES.get(param_lower)
+
+
+# Heuristics for mutators (substring match on the lowercased method name)
+_MUTATOR_RE = re.compile(r'add|set|update|create|insert|append|ekle|yukle|guncelle|kaydet')
+
+# Test-file fragments for the AST emitter, filled with str.format_map. Every line
+# ends in "\n"; literal braces in the generated code are doubled.
+_TPL_FILE_HEADER = """import pytest
+from typing import Any
+# Auto-generated comprehensive tests for 90%+ coverage
+
+"""
+
+_TPL_CLASS_INSTANTIATION = """# Comprehensive tests for {cls} class
+
+def test_{cls}_instantiation():
+    \"\"\"Test {cls} class instantiation\"\"\"
+    from source import {cls}
+"""
+
+_TPL_TRY_CONSTRUCT = """    try:
+        obj = {cls}({args})
+        assert obj is not None
+    except Exception: pass
+"""
+
+_TPL_CONSTRUCT = """    obj = {cls}()
+    assert obj is not None
+"""
+
+_TPL_ALL_METHODS = """def test_{cls}_all_methods():
+    \"\"\"Test all {cls} methods with proper inputs\"\"\"
+    from source import {cls}
+    obj = {cls}()
+
+"""
+
+_TPL_METHOD_CALL = """    # Test {method}{note}
+    try:
+        result = obj.{method}({args})
+    except Exception: pass
+"""
+
+_TPL_USER_TYPES = """def test_{cls}_user_types():
+    \"\"\"Test {cls} with different user types\"\"\"
+    from source import {cls}
+"""
+
+_TPL_LIFECYCLE = """def test_{cls}_scenario_lifecycle():
+    \"\"\"Test complete lifecycle: Init -> Mutate -> Access\"\"\"
+    from source import {cls}
+    import tempfile
+    
+    # FIX 14: Setup Mock Content
+    import json
+    try:
+        # Write valid JSON to the temp file expected by arguments. One object on one
+        # line reads both as a JSON document and as a JSONL task record (id key)
+        if '{has_json}':
+             with open({init_args}, 'w') as f:
+                 json.dump({{'id': '1', 'baslik': 'Test', 'oncelik': 1, 'tamamlandi': False, 'TestUrun': {{'fiyat': 100, 'stok': 100}}}}, f)
+                 f.write('\\n')
+    except Exception: pass
+    
+    # 1. Initialize
+    try:
+        obj = {cls}({init_args})
+    except TypeError:
+        obj = {cls}()
+    except Exception: pass
+    
+"""
+
+_TPL_MUTATE = """    try:
+        obj.{method}({args})
+    except Exception: pass
+"""
+
+_TPL_MUTATE_NO_ARGS = """    try: obj.{method}()
+    except Exception: pass
+"""
+
+_TPL_ACCESS = """    try:
+        result = obj.{method}({args})
+        assert result is not None or result is None
+    except Exception: pass
+"""
+
+_TPL_ACCESS_NO_ARGS = """    try:
+        result = obj.{method}()
+    except Exception: pass
+"""
+
+_TPL_FORCE_FAILURE = """    try:
+        # {reason}
+        obj.{method}({args})
+    except Exception: pass
+"""
+
+_TPL_FUNCTION_HEADER = """# Tests for {fn}
+
+"""
+
+_TPL_VALID_INPUT = """def test_{fn}_valid_input():
+    \"\"\"Test {fn} with valid inputs (Happy Path)\"\"\"
+"""
+
+_TPL_VALID_METHOD_CALL = """    from source import {cls}
+    obj = {cls}({init_args})
+    # Expect success
+    result = obj.{fn}({args})
+    # Verify return (if expected)
+    assert result is not None, 'Function returned None unexpectedly'
+
+"""
+
+_TPL_VALID_FUNCTION_CALL = """    from source import {fn}
+    # Expect success
+    result = {fn}({args})
+    assert result is not None
+
+"""
+
+_TPL_INVALID_INPUT = """def test_{fn}_invalid_input():
+    \"\"\"Test {fn} with invalid inputs (Edge Cases)\"\"\"
+"""
+
+_TPL_IMPORT_OBJ = """    from source import {cls}
+    obj = {cls}()
+"""
+
+_TPL_IMPORT_FUNCTION = """    from source import {fn}
+"""
+
+_TPL_EDGE_CASE = """    # Edge Case {n}: {inputs}
+    with pytest.raises((ValueError, TypeError, ZeroDivisionError)):
+        {target}(*{inputs})
+"""
+
+_TPL_EXECUTION = """def test_{fn}_execution():
+    \"\"\"Test {fn} execution\"\"\"
+"""
+
+# Fragments for improve_tests_with_coverage's targeted tests. {setup} is one of the
+# _TPL_SETUP_* blocks, already filled in; {prefix} is "obj." for methods.
+_TPL_TARGETED_HEADER = """
+
+# Targeted tests for uncovered branches
+"""
+
+_TPL_SETUP_FUNCTION = """    from source import {fn}
+"""
+
+_TPL_SETUP_OBJ = """    from source import {cls}
+    import tempfile
+    import os
+    obj = {cls}()
+"""
+
+_TPL_SETUP_OBJ_INIT = """    from source import {cls}
+    import tempfile
+    import os
+    try:
+        obj = {cls}({init_args})
+    except TypeError:
+        obj = {cls}()
+"""
+
+_TPL_DIR_TARGETED = """
+def test_{fn}_directory_targeted():
+{setup}    import tempfile
+    import shutil
+    temp_dir = tempfile.mkdtemp()
+    try:
+        # Expect success on valid directory
+        {prefix}{fn}(temp_dir)
+    finally:
+        shutil.rmtree(temp_dir)
+"""
+
+_TPL_FILE_TARGETED = """
+def test_{fn}_file_targeted():
+{setup}    import tempfile
+    import os
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+        f.write('test content')
+        temp_path = f.name
+    try:
+        # Expect success on valid file
+        {prefix}{fn}(temp_path)
+    finally:
+        try: os.unlink(temp_path)
+        except: pass
+"""
+
+_TPL_DICT_TARGETED = """
+def test_{fn}_dict_targeted():
+{setup}    # Targeted dict test (Happy Path)
+    {prefix}{fn}([{dict_str}])
+"""
+
+_TPL_TARGETED = """
+def test_{fn}_targeted():
+{setup}    # Happy Path
+    {prefix}{fn}({args})
+"""
+
+_TPL_TYPE_VALIDATION = """    
+    # Type Validation
+    with pytest.raises((TypeError, ValueError)):
+        {prefix}{fn}('invalid_string')
+    with pytest.raises((TypeError, ValueError)):
+        {prefix}{fn}(None)
+    with pytest.raises((TypeError, ValueError)):
+        {prefix}{fn}([])
+"""
+
+def _emit_class_tests(buf, class_info: dict, analysis: dict):
+    """
+    Write the instantiation, all-methods, user-type and lifecycle tests for one class.
+    Classes are independent of each other, so this is the unit to fan out if the
+    emitter is ever parallelized (with the GIL, threads would only add overhead).
+    """
+    class_name = class_info['name']
+    init_args = class_info.get('init_args', [])
+    methods = class_info.get('methods', [])
+    cls = {'cls': class_name}
+    
+    # Collect string literals from all methods for smart value generation
+    all_string_literals = set()
+    all_dict_keys = set()
+    for method in methods:
+        all_string_literals.update(method.get('string_literals', set()))
+        all_dict_keys.update(method.get('dict_keys', set()))
+    
+    # Test class instantiation with different constructor args
+    buf.write(_TPL_CLASS_INSTANTIATION.format_map(cls))
+    
+    # Test with default and various constructor args
+    if not init_args:
+        buf.write(_TPL_CONSTRUCT.format_map(cls))
+    else:
+        # Try different constructor arguments based on string literals:
+        # the default plus up to two short ones among the first five
+        constructor_variants = [""]  # Default
+        for lit in itertools.islice(all_string_literals, 5):
+            if lit and len(lit) < 20:
+                constructor_variants.append(f"'{lit}'")
+                if len(constructor_variants) == 3:
+                    break
         
-        # Check for common naming patterns
-        if any(x in param_lower for x in ['price', 'cost', 'amount', 'total', 'discount']):
-            param_types[param] = 'float'
-        elif any(x in param_lower for x in ['count', 'quantity', 'num', 'n', 'index']):
-            param_types[param] = 'int'
-        elif any(x in param_lower for x in ['name', 'type', 'code', 'country', 'status']):
-            param_types[param] = 'str'
-        elif any(x in param_lower for x in ['items', 'list', 'arr', 'numbers']):
-            param_types[param] = 'list'
-        elif any(x in param_lower for x in ['is_', 'has_', 'can_']):
-            param_types[param] = 'bool'
-        elif param_lower in ['data', 'config', 'options']:
-            param_types[param] = 'dict'
+        for variant in constructor_variants:
+            buf.write(_TPL_TRY_CONSTRUCT.format_map({'cls': class_name, 'args': variant}))
+    buf.write("\n")
+    
+    # Test all methods with proper inputs
+    buf.write(_TPL_ALL_METHODS.format_map(cls))
+    
+    for method in methods:
+        method_name = method['name']
+        if method_name == '__init__':
+            continue
+        
+        method_args = method.get('args', [])
+        
+        if _prime_func_info(method)['_dict_keys_list']:
+            # Method expects dict input - use extracted keys with proper types
+            dict_str = _sample_dict(method)
+            call = {'method': method_name, 'note': " with dict input", 'args': dict_str}
+        elif method_args:
+            # Use smart args
+            sample_args = _generate_comprehensive_args(method_args, "normal", method, analysis)
+            call = {'method': method_name, 'note': "", 'args': sample_args}
         else:
-            # Check usage in function body
-            for child in ast.walk(func_node):
-                if isinstance(child, ast.Name) and child.id == param:
-                    # Check context
-                    parent = getattr(child, 'parent', None)
-                    if isinstance(parent, ast.Subscript):
-                        param_types[param] = 'list'
-                        break
-                    elif isinstance(parent, ast.Call) and hasattr(parent.func, 'attr'):
-                        if parent.func.attr in ['get', 'keys', 'values']:
-                            param_types[param] = 'dict'
-                            break
-            
-            # Default to generic
-            if param not in param_types:
-                param_types[param] = 'any'
+            call = {'method': method_name, 'note': "", 'args': ""}
+        buf.write(_TPL_METHOD_CALL.format_map(call))
+    buf.write("\n")
     
-    return param_types
+    # Test with different user types (for ShoppingCart-like classes)
+    user_types = [lit for lit in all_string_literals if _has_any(lit.lower(), ('vip', 'premium', 'standard', 'admin', 'user'))]
+    if user_types:
+        buf.write(_TPL_USER_TYPES.format_map(cls))
+        for user_type in user_types[:3]:
+            buf.write(_TPL_TRY_CONSTRUCT.format_map({'cls': class_name, 'args': f"'{user_type}'"}))
+        buf.write("\n")
+    
+    # Implement Fix 10: Dynamic Scenario Generation (Stateful Tests)
+    # Instead of hardcoded cart tests, generating dynamic flows
+    
+    # 1. Identify Mutators (State changers) and Accessors (State readers)
+    mutators = []
+    accessors = []
+    
+    for method in methods:
+        m_name = method['name']
+        if m_name == '__init__': continue
+        
+        # Everything that isn't a mutator is tested as an accessor - readers
+        # (get/read/calc/...) and, to ensure it gets tested, anything unsure
+        if _MUTATOR_RE.search(m_name.lower()):
+            mutators.append(method)
+        else:
+            accessors.append(method)
+    
+    if mutators:
+        # Smart Instantiation (copying logic for scope)
+        init_arg_str = ""
+        if init_args:
+            init_arg_str = _generate_comprehensive_args(init_args, "normal", {'name': '__init__', 'args': init_args, 'param_types': {}}, analysis)
+        
+        # 1. Initialize, after FIX 14's mock file setup
+        buf.write(_TPL_LIFECYCLE.format_map({'cls': class_name, 'init_args': init_arg_str, 'has_json': 'json' in init_arg_str}))
+        
+        # 2. Call Mutators to populate state
+        buf.write("    # 2. Mutate State (Populate)\n")
+        for mutator in mutators:
+            mut_name = mutator['name']
+            mut_args = mutator['args']
+            if mut_args:
+                # Use Fix 11 (Constraint Values) via _generate_comprehensive_args
+                arg_str = _generate_comprehensive_args(mut_args, "normal", mutator, analysis)
+                buf.write(_TPL_MUTATE.format_map({'method': mut_name, 'args': arg_str}))
+            else:
+                buf.write(_TPL_MUTATE_NO_ARGS.format_map({'method': mut_name}))
+        buf.write("    \n")
+        
+        # 3. Call Accessors to verify state
+        buf.write("    # 3. Access State (Verify)\n")
+        for accessor in accessors:
+            acc_name = accessor['name']
+            acc_args = accessor['args']
+            if acc_args:
+                arg_str = _generate_comprehensive_args(acc_args, "normal", accessor, analysis)
+                buf.write(_TPL_ACCESS.format_map({'method': acc_name, 'args': arg_str}))
+            else:
+                buf.write(_TPL_ACCESS_NO_ARGS.format_map({'method': acc_name}))
+        buf.write("    \n")
+
+        # 4. FIX 13: Negative Scenarios (Force Failures/Else branches)
+        buf.write("    # 4. Negative Scenarios (Edge Cases)\n")
+        for mutator in mutators:
+            mut_name = mutator['name']
+            mut_args = mutator['args']
+            if mut_args:
+                # Generate 'edge' args (e.g. negative prices, empty strings)
+                arg_str = _generate_comprehensive_args(mut_args, "edge", mutator, analysis)
+                buf.write(_TPL_FORCE_FAILURE.format_map({'method': mut_name, 'args': arg_str, 'reason': "Force validation error"}))
+        
+        # Access with invalid data (e.g. requesting more than available)
+        for accessor in accessors:
+            acc_name = accessor['name']
+            acc_args = accessor['args']
+            if acc_args:
+                 # Generate 'edge' args (e.g. huge quantity)
+                arg_str = _generate_comprehensive_args(acc_args, "edge", accessor, analysis)
+                buf.write(_TPL_FORCE_FAILURE.format_map({'method': acc_name, 'args': arg_str, 'reason': "Force logic branch failure"}))
+        buf.write("\n")
+
+
+class _LineCountingWriter:
+    """Forwards writes to a text stream, counting the lines written (for the explanation)."""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.lines = 0
+
+    def write(self, text: str):
+        self.lines += text.count("\n")
+        self.out.write(text)
 
+def _emit(test_code: str, out: Optional[TextIO]) -> Optional[str]:
+    """Return test_code, or write it to out (with a final newline) when a stream was given."""
+    if out is None:
+        return test_code
+    out.write(test_code + "\n")
+    return None
 
-def generate_tests_with_ai(source_code: str, language: str = "python", use_ai: bool = True) -> tuple[str, str]:
+def generate_tests_with_ai(source_code: str, language: str = "python", use_ai: bool = True, *, out: Optional[TextIO] = None) -> tuple[Optional[str], str]:
     """
     Generates comprehensive tests using Gemini AI or enhanced AST analysis.
+    When an `out` stream is given the test code is written there as it is
+    generated (never held in memory as a whole) and None is returned in its place.
     """
     # Try Gemini AI first if enabled
     if use_ai:
         try:
-            from services.gemini_analyzer import generate_tests_directly
-            
             print("🤖 Using Gemini AI for direct test generation...")
             
             # Generate tests directly without JSON analysis step
-            test_code, explanation = generate_tests_directly(source_code, language)
+            test_code, explanation = _get_gemini().generate_tests_directly(source_code, language)
             
             if test_code and not test_code.startswith("# Error"):
                 print(f"✅ AI generated tests successfully")
-                return test_code, f"AI-Generated: {explanation}"
+                return _emit(test_code, out), f"AI-Generated: {explanation}"
             else:
                 print(f"⚠️ AI generation returned error, falling back to AST")
         except Exception as e:
@@ -231,218 +682,15 @@ def generate_tests_with_ai(source_code: str, language: str = "python", use_ai: b
     analysis = analyze_code_structure(source_code)
     
     if not analysis['functions']:
-        return "# No functions found to test", "No testable code"
+        return _emit("# No functions found to test", out), "No testable code"
     
-    tests = []
-    tests.append("import pytest")
-    tests.append("from typing import Any")
-    tests.append("# Auto-generated comprehensive tests for 90%+ coverage")
-    tests.append("")
+    classes_by_name = _classes_by_name(analysis)
+    buf = _LineCountingWriter(io.StringIO() if out is None else out)
+    buf.write(_TPL_FILE_HEADER)
     
     # Generate class-level tests first (if classes exist)
     for class_info in analysis.get('classes', []):
-        class_name = class_info['name']
-        init_args = class_info.get('init_args', [])
-        methods = class_info.get('methods', [])
-        
-        # Collect string literals from all methods for smart value generation
-        all_string_literals = set()
-        all_dict_keys = set()
-        for method in methods:
-            all_string_literals.update(method.get('string_literals', set()))
-            all_dict_keys.update(method.get('dict_keys', set()))
-        
-        tests.append(f"# Comprehensive tests for {class_name} class")
-        tests.append("")
-        
-        # Test class instantiation with different constructor args
-        tests.append(f"def test_{class_name}_instantiation():")
-        tests.append(f'    """Test {class_name} class instantiation"""')
-        tests.append(f"    from source import {class_name}")
-        
-        # Test with default and various constructor args
-        if init_args:
-            # Try different constructor arguments based on string literals
-            constructor_variants = [""]  # Default
-            for lit in list(all_string_literals)[:5]:
-                if lit and len(lit) < 20:
-                    constructor_variants.append(f"'{lit}'")
-            
-            for variant in constructor_variants[:3]:
-                tests.append(f"    try:")
-                if variant:
-                    tests.append(f"        obj = {class_name}({variant})")
-                else:
-                    tests.append(f"        obj = {class_name}()")
-                tests.append(f"        assert obj is not None")
-                tests.append(f"    except Exception: pass")
-        else:
-            tests.append(f"    obj = {class_name}()")
-            tests.append(f"    assert obj is not None")
-        tests.append("")
-        
-        # Test all methods with proper inputs
-        tests.append(f"def test_{class_name}_all_methods():")
-        tests.append(f'    """Test all {class_name} methods with proper inputs"""')
-        tests.append(f"    from source import {class_name}")
-        tests.append(f"    obj = {class_name}()")
-        tests.append("")
-        
-        for method in methods:
-            method_name = method['name']
-            if method_name == '__init__':
-                continue
-            
-            method_args = method.get('args', [])
-            dict_keys = list(method.get('dict_keys', set()))
-            string_literals = list(method.get('string_literals', set()))
-            
-            if dict_keys:
-                # Method expects dict input - use extracted keys with proper types
-                dict_str = _build_dict_from_keys(dict_keys, string_literals)
-                tests.append(f"    # Test {method_name} with dict input")
-                tests.append(f"    try:")
-                tests.append(f"        result = obj.{method_name}({dict_str})")
-                tests.append(f"    except Exception: pass")
-            elif method_args:
-                # Use smart args
-                sample_args = _generate_comprehensive_args(method_args, "normal", method, analysis)
-                tests.append(f"    # Test {method_name}")
-                tests.append(f"    try:")
-                tests.append(f"        result = obj.{method_name}({sample_args})")
-                tests.append(f"    except Exception: pass")
-            else:
-                tests.append(f"    # Test {method_name}")
-                tests.append(f"    try:")
-                tests.append(f"        result = obj.{method_name}()")
-                tests.append(f"    except Exception: pass")
-        tests.append("")
-        
-        # Test with different user types (for ShoppingCart-like classes)
-        user_types = [lit for lit in all_string_literals if any(x in lit.lower() for x in ['vip', 'premium', 'standard', 'admin', 'user'])]
-        if user_types:
-            tests.append(f"def test_{class_name}_user_types():")
-            tests.append(f'    """Test {class_name} with different user types"""')
-            tests.append(f"    from source import {class_name}")
-            for user_type in user_types[:3]:
-                tests.append(f"    try:")
-                tests.append(f"        obj = {class_name}('{user_type}')")
-                tests.append(f"        assert obj is not None")
-                tests.append(f"    except Exception: pass")
-            tests.append("")
-        
-        # Implement Fix 10: Dynamic Scenario Generation (Stateful Tests)
-        # Instead of hardcoded cart tests, generating dynamic flows
-        
-        # 1. Identify Mutators (State changers) and Accessors (State readers)
-        mutators = []
-        accessors = []
-        
-        for method in methods:
-            m_name = method['name']
-            if m_name == '__init__': continue
-            
-            m_lower = m_name.lower()
-            # Heuristics for mutators
-            if any(x in m_lower for x in ['add', 'set', 'update', 'create', 'insert', 'append', 'ekle', 'yukle', 'guncelle', 'kaydet']):
-                mutators.append(method)
-            # Heuristics for accessors
-            elif any(x in m_lower for x in ['get', 'read', 'calc', 'process', 'report', 'is_', 'has_', 'isle', 'rapor', 'listele']):
-                accessors.append(method)
-            else:
-                # Default to accessor if unsure, to ensure it gets tested
-                accessors.append(method)
-        
-        if mutators:
-            tests.append(f"def test_{class_name}_scenario_lifecycle():")
-            tests.append(f'    """Test complete lifecycle: Init -> Mutate -> Access"""')
-            tests.append(f"    from source import {class_name}")
-            tests.append(f"    import tempfile")
-            tests.append(f"    ")
-            
-            # Smart Instantiation (copying logic for scope)
-            init_arg_str = ""
-            if init_args:
-                init_arg_str = _generate_comprehensive_args(init_args, "normal", {'name': '__init__', 'args': init_args, 'param_types': {}}, analysis)
-            
-            # FIX 14: Deep Content Mocking (Setup file before usage)
-            # If the class reads files in __init__ or methods (detected by body_indicators), ensure content exists
-            tests.append(f"    # FIX 14: Setup Mock Content")
-            tests.append(f"    import json")
-            tests.append(f"    try:")
-            tests.append(f"        # Write valid JSON to the temp file expected by arguments")
-            tests.append(f"        if '{'json' in init_arg_str}':")
-            tests.append(f"             with open({init_arg_str}, 'w') as f:")
-            tests.append(f"                 json.dump({{'TestUrun': {{'fiyat': 100, 'stok': 100}}, '1': {{'baslik': 'Test', 'oncelik': 1}}}}, f)")
-            tests.append(f"    except Exception: pass")
-            tests.append(f"    ")
-
-            tests.append(f"    # 1. Initialize")
-            tests.append(f"    try:")
-            tests.append(f"        obj = {class_name}({init_arg_str})")
-            tests.append(f"    except TypeError:")
-            tests.append(f"        obj = {class_name}()")
-            tests.append(f"    except Exception: pass")
-            tests.append(f"    ")
-            
-            # 2. Call Mutators to populate state
-            tests.append(f"    # 2. Mutate State (Populate)")
-            for mutator in mutators:
-                mut_name = mutator['name']
-                mut_args = mutator['args']
-                if mut_args:
-                    # Use Fix 11 (Constraint Values) via _generate_comprehensive_args
-                    arg_str = _generate_comprehensive_args(mut_args, "normal", mutator, analysis)
-                    tests.append(f"    try:")
-                    tests.append(f"        obj.{mut_name}({arg_str})")
-                    tests.append(f"    except Exception: pass")
-                else:
-                    tests.append(f"    try: obj.{mut_name}()")
-                    tests.append(f"    except Exception: pass")
-            tests.append(f"    ")
-            
-            # 3. Call Accessors to verify state
-            tests.append(f"    # 3. Access State (Verify)")
-            for accessor in accessors:
-                acc_name = accessor['name']
-                acc_args = accessor['args']
-                if acc_args:
-                    arg_str = _generate_comprehensive_args(acc_args, "normal", accessor, analysis)
-                    tests.append(f"    try:")
-                    tests.append(f"        result = obj.{acc_name}({arg_str})")
-                    tests.append(f"        assert result is not None or result is None")
-                    tests.append(f"    except Exception: pass")
-                else:
-                    tests.append(f"    try:")
-                    tests.append(f"        result = obj.{acc_name}()")
-                    tests.append(f"    except Exception: pass")
-            tests.append(f"    ")
-
-            # 4. FIX 13: Negative Scenarios (Force Failures/Else branches)
-            tests.append(f"    # 4. Negative Scenarios (Edge Cases)")
-            for mutator in mutators:
-                mut_name = mutator['name']
-                mut_args = mutator['args']
-                if mut_args:
-                    # Generate 'edge' args (e.g. negative prices, empty strings)
-                    arg_str = _generate_comprehensive_args(mut_args, "edge", mutator, analysis)
-                    tests.append(f"    try:")
-                    tests.append(f"        # Force validation error")
-                    tests.append(f"        obj.{mut_name}({arg_str})")
-                    tests.append(f"    except Exception: pass")
-            
-            # Access with invalid data (e.g. requesting more than available)
-            for accessor in accessors:
-                acc_name = accessor['name']
-                acc_args = accessor['args']
-                if acc_args:
-                     # Generate 'edge' args (e.g. huge quantity)
-                    arg_str = _generate_comprehensive_args(acc_args, "edge", accessor, analysis)
-                    tests.append(f"    try:")
-                    tests.append(f"        # Force logic branch failure")
-                    tests.append(f"        obj.{acc_name}({arg_str})")
-                    tests.append(f"    except Exception: pass")
-            tests.append("")
+        _emit_class_tests(buf, class_info, analysis)
     
     for func in analysis['functions']:
         func_name = func['name']
@@ -456,76 +704,59 @@ def generate_tests_with_ai(source_code: str, language: str = "python", use_ai: b
             continue
         
         # Generate comprehensive test suite for each function
-        tests.append(f"# Tests for {func_name}")
-        tests.append("")
+        names = {'fn': func_name, 'cls': class_name}
+        buf.write(_TPL_FUNCTION_HEADER.format_map(names))
         
         if args:
             # 1. HAPPY PATH (Positive Scenarios)
             # Must succeed without error
-            tests.append(f"def test_{func_name}_valid_input():")
-            tests.append(f'    """Test {func_name} with valid inputs (Happy Path)"""')
+            buf.write(_TPL_VALID_INPUT.format_map(names))
             
             if is_method and class_name:
-                tests.append(f"    from source import {class_name}")
+                init_str = ""
+                # The method's own class (not whichever class the loop above saw last)
+                init_args = classes_by_name.get(class_name, {}).get('init_args', [])
                 if init_args:
                      init_str = _generate_comprehensive_args(init_args, "normal", {'name': '__init__', 'args': init_args}, analysis)
-                     tests.append(f"    obj = {class_name}({init_str})")
-                else:
-                     tests.append(f"    obj = {class_name}()")
                 
                 # Generate valid args
                 valid_args = _generate_comprehensive_args(args, "normal", func, analysis)
-                tests.append(f"    # Expect success")
-                tests.append(f"    result = obj.{func_name}({valid_args})")
-                tests.append(f"    # Verify return (if expected)")
-                tests.append(f"    assert result is not None, 'Function returned None unexpectedly'")
+                buf.write(_TPL_VALID_METHOD_CALL.format_map({**names, 'init_args': init_str, 'args': valid_args}))
             else:
-                tests.append(f"    from source import {func_name}")
                 valid_args = _generate_comprehensive_args(args, "normal", func, analysis)
-                tests.append(f"    # Expect success")
-                tests.append(f"    result = {func_name}({valid_args})")
-                tests.append(f"    assert result is not None")
-            tests.append("")
+                buf.write(_TPL_VALID_FUNCTION_CALL.format_map({**names, 'args': valid_args}))
 
             # 2. EDGE CASES (Negative Scenarios)
             # Must raise specific errors
-            tests.append(f"def test_{func_name}_invalid_input():")
-            tests.append(f'    """Test {func_name} with invalid inputs (Edge Cases)"""')
+            buf.write(_TPL_INVALID_INPUT.format_map(names))
             
             if is_method and class_name:
-                tests.append(f"    from source import {class_name}")
-                tests.append(f"    obj = {class_name}()") # Default init for speed
-                
-                edge_inputs = _generate_edge_case_inputs(args, func)
-                for i, inp_tuple in enumerate(edge_inputs[:3]): # Test top 3 edge cases
-                     tests.append(f"    # Edge Case {i+1}: {inp_tuple}")
-                     tests.append(f"    with pytest.raises((ValueError, TypeError, ZeroDivisionError)):")
-                     tests.append(f"        obj.{func_name}(*{inp_tuple})")
+                buf.write(_TPL_IMPORT_OBJ.format_map(names)) # Default init for speed
+                target = f"obj.{func_name}"
             else:
-                tests.append(f"    from source import {func_name}")
-                edge_inputs = _generate_edge_case_inputs(args, func)
-                for i, inp_tuple in enumerate(edge_inputs[:3]):
-                     tests.append(f"    # Edge Case {i+1}: {inp_tuple}")
-                     tests.append(f"    with pytest.raises((ValueError, TypeError, ZeroDivisionError)):")
-                     tests.append(f"        {func_name}(*{inp_tuple})")
-            tests.append("")
+                buf.write(_TPL_IMPORT_FUNCTION.format_map(names))
+                target = func_name
+            edge_inputs = _edge_case_inputs(tuple(args))
+            for i, inp_tuple in enumerate(edge_inputs[:3]): # Test top 3 edge cases
+                buf.write(_TPL_EDGE_CASE.format_map({'n': i + 1, 'inputs': inp_tuple, 'target': target}))
+            buf.write("\n")
         else:
             # No args - just run it
-            tests.append(f"def test_{func_name}_execution():")
-            tests.append(f'    """Test {func_name} execution"""')
+            buf.write(_TPL_EXECUTION.format_map(names))
             if is_method and class_name:
-                tests.append(f"    from source import {class_name}")
-                tests.append(f"    obj = {class_name}()")
-                tests.append(f"    obj.{func_name}()")
+                buf.write(_TPL_IMPORT_OBJ.format_map(names))
+                buf.write(f"    obj.{func_name}()\n")
             else:
-                tests.append(f"    from source import {func_name}")
-                tests.append(f"    {func_name}()")
-            tests.append("")
+                buf.write(_TPL_IMPORT_FUNCTION.format_map(names))
+                buf.write(f"    {func_name}()\n")
+            buf.write("\n")
         
 
     
-    test_code = "\n".join(tests)
-    explanation = f"Enhanced AST: Generated {len(analysis['functions'])} comprehensive test suites with {len(tests)} test cases for 90%+ coverage"
+    # Every template line ends in "\n"; the old line-list join had no final newline
+    test_code = buf.out.getvalue()[:-1] if out is None else None
+    line_count = buf.lines
+    explanation = f"Enhanced AST: Generated {len(analysis['functions'])} comprehensive test suites with {line_count} test cases for 90%+ coverage"
     
     return test_code, explanation
 
@@ -536,7 +767,7 @@ def improve_tests_with_coverage(source_code: str, current_tests: str, missing_li
     # 1. Try AI Improvement if enabled
     if use_ai:
         try:
-            from services.gemini_analyzer import improve_tests_with_ai, analyze_test_coverage
+            gemini = _get_gemini()
             print("🤖 Using Gemini AI for test improvement...")
             
             # First analyze why coverage is low
@@ -546,11 +777,11 @@ def improve_tests_with_coverage(source_code: str, current_tests: str, missing_li
             }
             
             # Get AI analysis of coverage
-            analysis = analyze_test_coverage(source_code, current_tests, coverage_data)
+            analysis = gemini.analyze_test_coverage(source_code, current_tests, coverage_data)
             
             if "error" not in analysis:
                 # Ask AI to improve tests based on analysis
-                improved_tests, explanation = improve_tests_with_ai(source_code, current_tests, analysis)
+                improved_tests, explanation = gemini.improve_tests_with_ai(source_code, current_tests, analysis)
                 return improved_tests, f"AI-Improved: {explanation}"
             else:
                 print(f"⚠️ AI Coverage analysis failed: {analysis['error']}")
@@ -560,17 +791,24 @@ def improve_tests_with_coverage(source_code: str, current_tests: str, missing_li
 
     # 2. Fallback to Enhanced AST-based improvement
     analysis = analyze_code_structure(source_code)
+    classes_by_name = _classes_by_name(analysis)
     
-    additional_tests = []
-    additional_tests.append("\n\n# Targeted tests for uncovered branches")
+    # The existing tests go in first, so the result is assembled in one buffer
+    buf = io.StringIO()
+    buf.write(current_tests)
+    buf.write(_TPL_TARGETED_HEADER)
+    tests_added = 0
+    # Every method of a class shares one instantiation block
+    class_setups = {}
     
     # Filter functions that actually have missing lines (Targeted Testing)
     target_functions = []
     if missing_lines:
+        missing = set(missing_lines)
         for func in analysis['functions']:
             f_start = func.get('lineno', 0)
             f_end = func.get('end_lineno', 999999)
-            if any(line in missing_lines for line in range(f_start, f_end + 1)):
+            if not missing.isdisjoint(range(f_start, f_end + 1)):
                 target_functions.append(func)
     else:
         # Fallback: if no line info, test everything
@@ -579,8 +817,7 @@ def improve_tests_with_coverage(source_code: str, current_tests: str, missing_li
     for func in target_functions:
         func_name = func['name']
         args = func.get('args', [])
-        dict_keys = list(func.get('dict_keys', set()))
-        string_literals = list(func.get('string_literals', set()))
+        dict_keys = _prime_func_info(func)['_dict_keys_list']
         body_inds = func.get('body_indicators', set())
         is_method = func.get('is_method', False)
         class_name = func.get('class_name', None)
@@ -588,204 +825,182 @@ def improve_tests_with_coverage(source_code: str, current_tests: str, missing_li
         if func_name == '__init__':
             continue
             
-        # Helper to generate context-aware setup
-        def get_setup_block(is_method, class_name):
-            setup_lines = []
-            if is_method and class_name:
-                setup_lines.append(f"    from source import {class_name}")
-                setup_lines.append(f"    import tempfile")
-                setup_lines.append(f"    import os")
-                
+        # Context-aware setup
+        names = {'fn': func_name, 'cls': class_name, 'prefix': ""}
+        if is_method and class_name:
+            names['prefix'] = "obj."
+            setup = class_setups.get(class_name)
+            if setup is None:
                 # Smart Instantiation (Fix 8 Logic)
-                init_args = []
-                for cls in analysis.get('classes', []):
-                    if cls['name'] == class_name:
-                        init_args = cls.get('init_args', [])
-                        break
-                
+                init_args = classes_by_name.get(class_name, {}).get('init_args', [])
                 if init_args:
                     init_arg_str = _generate_comprehensive_args(init_args, "normal", {'name': '__init__', 'args': init_args, 'param_types': {}}, analysis)
-                    setup_lines.append(f"    try:")
-                    setup_lines.append(f"        obj = {class_name}({init_arg_str})")
-                    setup_lines.append(f"    except TypeError:")
-                    setup_lines.append(f"        obj = {class_name}()")
+                    setup = _TPL_SETUP_OBJ_INIT.format_map({'cls': class_name, 'init_args': init_arg_str})
                 else:
-                    setup_lines.append(f"    obj = {class_name}()")
-            else:
-                setup_lines.append(f"    from source import {func_name}")
-            return setup_lines
+                    setup = _TPL_SETUP_OBJ.format_map(names)
+                class_setups[class_name] = setup
+            names['setup'] = setup
+        else:
+            names['setup'] = _TPL_SETUP_FUNCTION.format_map(names)
 
         # Check parameter names AND body indicators
         args_str = ' '.join(args).lower()
         
         # Priority: Body indicators > Name heuristics
-        is_dir_util = 'dir_op' in body_inds or (any(x in args_str for x in ['directory', 'dir', 'folder', 'path']) and 'file' not in args_str)
-        is_file_util = 'file_op' in body_inds or (any(x in args_str for x in ['file', 'filepath', 'filename']))
+        is_dir_util = 'dir_op' in body_inds or (_has_any(args_str, ('directory', 'dir', 'folder', 'path')) and 'file' not in args_str)
+        is_file_util = 'file_op' in body_inds or (_has_any(args_str, ('file', 'filepath', 'filename')))
         
+        tests_added += 1
         # CASE 1: Directory Utility
         if is_dir_util or 'search' in func_name.lower():
-            additional_tests.append(f"\ndef test_{func_name}_directory_targeted():")
-            additional_tests.extend(get_setup_block(is_method, class_name))
-            additional_tests.append(f"    import tempfile")
-            additional_tests.append(f"    import shutil")
-            additional_tests.append(f"    temp_dir = tempfile.mkdtemp()")
-            additional_tests.append(f"    try:")
-            additional_tests.append(f"        # Expect success on valid directory")
-            call_prefix = "obj." if is_method and class_name else ""
-            additional_tests.append(f"        {call_prefix}{func_name}(temp_dir)")
-            additional_tests.append(f"    finally:")
-            additional_tests.append(f"        shutil.rmtree(temp_dir)")
+            buf.write(_TPL_DIR_TARGETED.format_map(names))
 
         # CASE 2: File Utility
         elif is_file_util:
-            additional_tests.append(f"\ndef test_{func_name}_file_targeted():")
-            additional_tests.extend(get_setup_block(is_method, class_name))
-            additional_tests.append(f"    import tempfile")
-            additional_tests.append(f"    import os")
-            additional_tests.append(f"    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:")
-            additional_tests.append(f"        f.write('test content')")
-            additional_tests.append(f"        temp_path = f.name")
-            additional_tests.append(f"    try:")
-            call_prefix = "obj." if is_method and class_name else ""
-            additional_tests.append(f"        # Expect success on valid file")
-            additional_tests.append(f"        {call_prefix}{func_name}(temp_path)")
-            additional_tests.append(f"    finally:")
-            additional_tests.append(f"        try: os.unlink(temp_path)")
-            additional_tests.append(f"        except: pass")
+            buf.write(_TPL_FILE_TARGETED.format_map(names))
         
         # CASE 3: Generic Dictionary/List Tests
         elif dict_keys:
-            dict_str = _build_dict_from_keys(dict_keys, string_literals)
-            additional_tests.append(f"\ndef test_{func_name}_dict_targeted():")
-            additional_tests.extend(get_setup_block(is_method, class_name))
-            additional_tests.append(f"    # Targeted dict test (Happy Path)")
-            call_prefix = "obj." if is_method and class_name else ""
-            additional_tests.append(f"    {call_prefix}{func_name}([{dict_str}])")
+            dict_str = _sample_dict(func)
+            buf.write(_TPL_DICT_TARGETED.format_map({**names, 'dict_str': dict_str}))
 
         else:
-            # Generic context-aware tests with Smart Args (Fix 9)
-            additional_tests.append(f"\ndef test_{func_name}_targeted():")
-            additional_tests.extend(get_setup_block(is_method, class_name))
-            
-            # Generate tests with smart args using Dependency Injection
+            # Generic context-aware tests with Smart Args (Fix 9) using Dependency Injection
             smart_args = _generate_comprehensive_args(args, "normal", func, analysis)
-            call_prefix = "obj." if is_method and class_name else ""
-            
-            additional_tests.append(f"    # Happy Path")
-            additional_tests.append(f"    {call_prefix}{func_name}({smart_args})")
+            buf.write(_TPL_TARGETED.format_map({**names, 'args': smart_args}))
                 
             # Test with boundary values for numeric args
             if any(arg_type == 'int' for arg_type in func.get('param_types', {}).values()):
                 # Test invalid inputs explicitly
-                additional_tests.append(f"    ")
-                additional_tests.append(f"    # Type Validation")
-                for val in ["'invalid_string'", "None", "[]"]:
-                    additional_tests.append(f"    with pytest.raises((TypeError, ValueError)):")
-                    additional_tests.append(f"        {call_prefix}{func_name}({val})")
+                buf.write(_TPL_TYPE_VALIDATION.format_map(names))
     
-    improved_tests = current_tests + "\n".join(additional_tests)
-    explanation = f"Added {len(additional_tests)} targeted branch tests"
+    # As in generate_tests_with_ai, drop the final newline the templates leave
+    buf.truncate(buf.tell() - 1)
+    improved_tests = buf.getvalue()
+    explanation = f"Added {tests_added} targeted branch tests"
     
     return improved_tests, explanation
 
-def _generate_sample_args(args: list) -> str:
-    """Generate sample arguments for function calls."""
-    samples = []
-    for arg in args:
-        if 'num' in arg or 'score' in arg or 'val' in arg or 'n' == arg:
-            samples.append("42")
-        elif 'str' in arg or 'name' in arg or 'text' in arg:
-            samples.append("'test'")
-        elif 'list' in arg or 'arr' in arg or 'items' in arg or 'numbers' in arg:
-            samples.append("[1, 2, 3]")
-        else:
-            samples.append("None")
-    return ", ".join(samples)
+# Name categories for _generate_comprehensive_args, compiled once. Still substring
+# matches: names like 'siparisler' or 'urun_listesi' rely on them.
+_ARG_LIST_RE = _keyword_re('list', 'items', 'siparis', 'orders', 'urunler', 'products')
+_ARG_DIR_RE = _keyword_re('directory', 'dir', 'folder', 'path')
+_ARG_FILE_RE = _keyword_re('filepath', 'file_path', 'filename', 'file', 'db_path', 'veritabani')
+_ARG_PATTERN_RE = _keyword_re('pattern', 'search', 'query', 'filter', 'keyword')
+_ARG_INT_RE = _keyword_re('gun', 'day', 'yil', 'year', 'count', 'num', 'int', 'depth', 'max', 'min', 'limit', 'stok', 'stock', 'adet', 'quantity')
+_ARG_FLOAT_RE = _keyword_re('oran', 'rate', 'ratio', 'float', 'percent', 'fiyat', 'price', 'tutar', 'amount', 'cost')
+_ARG_BOOL_RE = _keyword_re('include', 'skip', 'hidden', 'recursive', 'enable', 'flag')
+_ARG_TEXT_RE = _keyword_re('name', 'title', 'text', 'message', 'code', 'method', 'ad')
+
+# Argument categories in priority order (the old CASE 1..9 cascade): the first rule
+# whose type or name test matches wins, otherwise 'text'/'default' by name.
+_ARG_RULES = (
+    ('list', lambda t, n: t == 'list' or _ARG_LIST_RE.search(n)),
+    ('dir', lambda t, n: _ARG_DIR_RE.search(n) and 'file' not in n),
+    ('file', lambda t, n: _ARG_FILE_RE.search(n)),
+    ('pattern', lambda t, n: _ARG_PATTERN_RE.search(n)),
+    ('int', lambda t, n: t == 'int' or _ARG_INT_RE.search(n)),
+    ('float', lambda t, n: t == 'float' or _ARG_FLOAT_RE.search(n)),
+    ('str', lambda t, n: t == 'str'),
+    ('dict', lambda t, n: t == 'dict'),
+    ('bool', lambda t, n: t == 'bool' or _ARG_BOOL_RE.search(n)),
+    ('text', lambda t, n: _ARG_TEXT_RE.search(n)),
+)
+
+@functools.lru_cache(maxsize=4096)
+def _arg_category(arg_type: str, arg_lower: str) -> str:
+    """Category of an argument for _generate_comprehensive_args (cached per type/name pair)."""
+    return next((category for category, matches in _ARG_RULES if matches(arg_type, arg_lower)), 'default')
+
+def _prime_func_info(func_info: dict) -> dict:
+    """
+    Add list forms of dict_keys/string_literals to func_info on first use, so every
+    argument and pass iterates them in the same order without re-converting. They
+    only depend on the function itself, which keeps the shared cached analysis valid.
+    """
+    if '_dict_keys_list' not in func_info:
+        func_info['_string_literals_list'] = list(func_info.get('string_literals', set()))
+        func_info['_dict_keys_list'] = list(func_info.get('dict_keys', set()))
+    return func_info
+
+def _sample_dict(func_info: dict) -> str:
+    """_build_dict_from_keys for a primed func_info, built once per function."""
+    sample = func_info.get('_sample_dict')
+    if sample is None:
+        sample = func_info['_sample_dict'] = _build_dict_from_keys(func_info['_dict_keys_list'], func_info['_string_literals_list'])
+    return sample
+
+def _list_arg(func_info: dict) -> str:
+    # Likely List[Dict] when dict_keys exist - one item with every extracted key
+    if func_info['_dict_keys_list']:
+        return f"[{_sample_dict(func_info)}]"
+    return "[1, 2, 3]"
+
+def _dict_arg(func_info: dict) -> str:
+    if func_info['_dict_keys_list']:
+        return _sample_dict(func_info)
+    return "{'key': 'value'}"
+
+def _str_arg(func_info: dict) -> str:
+    literals = func_info['_string_literals_list']
+    return f"'{literals[0]}'" if literals else "'test'"
+
+# Samples that never depend on the function: one shared string per category
+_ARG_CONST_SAMPLES = {
+    'dir': "'.' if os.path.exists('.') else '/tmp'",  # Safe default
+    'file': "'test_db.json'",  # Generic temp name
+    'pattern': "'.py'",
+    'int': "10",
+    'float': "100.0",
+    'bool': "True",
+    'text': "'Test Name'",
+    'default': "10",
+}
+
+# The rest are built from the primed func_info
+_ARG_EMITTERS = {
+    'list': _list_arg,
+    'str': _str_arg,
+    'dict': _dict_arg,
+}
 
-def _generate_comprehensive_args(args: list, scenario: str = "normal", func_info: dict = None, analysis: dict = None) -> str:
-    """Generate comprehensive test arguments using extracted dict_keys and param_types."""
+def _generate_comprehensive_args(args: list, scenario: str = "normal", func_info: dict = None, analysis: dict = None, *, _seen: frozenset = frozenset()) -> str:
+    """
+    Generate comprehensive test arguments using extracted dict_keys and param_types.
+    _seen holds the classes already being constructed further up the injection chain.
+    """
     if scenario != "normal":
         return "None"
     
     samples = []
-    param_types = func_info.get('param_types', {}) if func_info else {}
-    dict_keys = list(func_info.get('dict_keys', set())) if func_info else []
-    string_literals = list(func_info.get('string_literals', set())) if func_info else []
-    classes = analysis.get('classes', []) if analysis else []
+    func_info = _prime_func_info(func_info if func_info is not None else {})
+    param_types = func_info.get('param_types', {})
+    classes_by_name = _classes_by_name(analysis) if analysis else {}
     
     for arg in args:
         arg_type = param_types.get(arg, 'any')
-        arg_lower = arg.lower()
+        # Parameter names are usually lowercase already; skip the copy then
+        arg_lower = arg if arg.islower() else arg.lower()
 
         # CASE 0: Dependency Injection (Check if arg type matches a known class)
-        matched_class = next((cls for cls in classes if cls['name'] == arg_type), None)
+        matched_class = classes_by_name.get(arg_type)
         if matched_class:
             # Generate instance for this class
             init_args = matched_class.get('init_args', [])
-            if init_args:
+            # A class that (indirectly) needs itself gets a bare constructor instead of
+            # recursing forever, e.g. `class any` whose init args default to type 'any'
+            if init_args and arg_type not in _seen:
                 # Recursively generate args for the dependency's init
-                init_arg_str = _generate_comprehensive_args(init_args, "normal", {'name': '__init__', 'args': init_args, 'param_types': {}}, analysis)
+                init_arg_str = _generate_comprehensive_args(init_args, "normal", {'name': '__init__', 'args': init_args, 'param_types': {}}, analysis, _seen=_seen | {arg_type})
                 samples.append(f"{arg_type}({init_arg_str})")
             else:
                 samples.append(f"{arg_type}()")
             continue
         
-        # CASE 1: List type (likely List[Dict] if dict_keys exist)
-        if arg_type == 'list' or any(x in arg_lower for x in ['list', 'items', 'siparis', 'orders', 'urunler', 'products']):
-            if dict_keys:
-                # Build a dict with all extracted keys
-                dict_str = _build_dict_from_keys(dict_keys, string_literals)
-                # Generate a list with a few items to test loops
-                samples.append(f"[{dict_str}]")
-            else:
-                samples.append("[1, 2, 3]")
-        
-        # CASE 2: Directory path
-        elif any(x in arg_lower for x in ['directory', 'dir', 'folder', 'path']) and 'file' not in arg_lower:
-            samples.append("'.' if os.path.exists('.') else '/tmp'")  # Safe default
-        
-        # CASE 3: File path
-        elif any(x in arg_lower for x in ['filepath', 'file_path', 'filename', 'file', 'db_path', 'veritabani']):
-             # Use a generic temp name
-            samples.append("'test_db.json'")
-        
-        # CASE 4: Pattern/search string
-        elif any(x in arg_lower for x in ['pattern', 'search', 'query', 'filter', 'keyword']):
-            samples.append("'.py'")
-        
-        # CASE 5: Integer types
-        elif arg_type == 'int' or any(x in arg_lower for x in ['gun', 'day', 'yil', 'year', 'count', 'num', 'int', 'depth', 'max', 'min', 'limit', 'stok', 'stock', 'adet', 'quantity']):
-            samples.append("10")
-        
-        # CASE 6: Float types
-        elif arg_type == 'float' or any(x in arg_lower for x in ['oran', 'rate', 'ratio', 'float', 'percent', 'fiyat', 'price', 'tutar', 'amount', 'cost']):
-            samples.append("100.0")
-        
-        # CASE 7: String types
-        elif arg_type == 'str':
-            if string_literals:
-                samples.append(f"'{string_literals[0]}'")
-            else:
-                samples.append("'test'")
-        
-        # CASE 8: Dict type
-        elif arg_type == 'dict':
-            if dict_keys:
-                dict_str = _build_dict_from_keys(dict_keys, string_literals)
-                samples.append(dict_str)
-            else:
-                samples.append("{'key': 'value'}")
-        
-        # CASE 9: Bool type
-        elif arg_type == 'bool' or any(x in arg_lower for x in ['include', 'skip', 'hidden', 'recursive', 'enable', 'flag']):
-            samples.append("True")
-        
-        # FALLBACK - try to infer from name patterns
-        else:
-            if any(x in arg_lower for x in ['name', 'title', 'text', 'message', 'code', 'method', 'ad']):
-                samples.append("'Test Name'")
-            else:
-                samples.append("10")
+        # CASE 1..9 + FALLBACK
+        category = _arg_category(arg_type, arg_lower)
+        sample = _ARG_CONST_SAMPLES.get(category)
+        samples.append(sample if sample is not None else _ARG_EMITTERS[category](func_info))
     
     return ", ".join(samples)
 
@@ -794,322 +1009,123 @@ def _build_dict_from_keys(keys: list, string_literals: list) -> str:
     parts = []
     
     # Filter out output-only keys (keys that look like result/total fields)
-    output_key_patterns = ['toplam', 'total', 'result', 'sonuc', 'output', 'maliyet']
-    input_keys = [k for k in keys if not any(p in k.lower() for p in output_key_patterns)]
+    output_key_patterns = ('toplam', 'total', 'result', 'sonuc', 'output', 'maliyet')
+    keys_lower = [(k, k.lower()) for k in keys]
+    input_keys = [kl for kl in keys_lower if not _has_any(kl[1], output_key_patterns)]
     
     # If all keys were filtered, use original keys (fallback)
     if not input_keys:
-        input_keys = keys
+        input_keys = keys_lower
     
     # Filter string literals to find role/position values (not output keys)
-    role_literals = [lit for lit in string_literals if any(x in lit.lower() for x in ['yönetici', 'uzman', 'manager', 'admin', 'employee'])]
+    role_literals = [lit for lit in string_literals if _has_any(lit.lower(), ('yönetici', 'uzman', 'manager', 'admin', 'employee'))]
     
-    for key in input_keys:
-        key_lower = key.lower()
-        
-        # Assign values based on key name patterns
-        if  any(x  in  key_lower  for  x  in  ['ucret',  'price',  'cost',  'salary',  'amount',  'maas']):
-            value = "100"  # Consistent price
-        elif any(x in key_lower for x in ['gun', 'day', 'count', 'quantity', 'num', 'adet', 'stock', 'stok']):
-            # Fix 12: Safe demand value (5) vs Supply (100)
-            value = "5"
-        elif any(x in key_lower for x in ['yil', 'year']):
-            value = "2020"
-        elif any(x in key_lower for x in ['ad', 'name', 'isim']):
-            value = "'TestUrun'"  # FIX 15: Standardized Key
-        elif any(x in key_lower for x in ['pozisyon', 'role', 'title', 'job']):
+    for key, key_lower in input_keys:
+        value = _dict_key_value(key_lower)
+        if value is None:
             # Use role string literal if available (e.g., 'Yönetici')
             if role_literals:
                 value = f"'{role_literals[0]}'"
             else:
                 value = "'Yönetici'"
-        else:
-            value = "'value'"
         
         parts.append(f"'{key}': {value}")
     
     return "{" + ", ".join(parts) + "}"
 
-def _generate_smart_test_values(param_name: str, param_type: str, string_literals: set, func_info: dict = None) -> list:
-    """
-    Generate comprehensive test values based on parameter type and code context.
-    Returns list of test values as strings.
-    """
-    values = []
-    
-    # 1. Constraint-Based Generation (Fix 11)
-    # Extract values from Code Comparisons (e.g. "if price > 100")
-    constraint_values = []
-    if func_info and 'comparisons' in func_info:
-        for comp in func_info['comparisons']:
-            # Check if this comparison involves our parameter
-            left_side = comp.get('left', '').lower()
-            if param_name.lower() in left_side:
-                # Extract the value being compared against
-                candidates = comp.get('comparators', [])
-                for val_str in candidates:
-                    # Valid number format
-                    if val_str.replace('.', '', 1).isdigit() or (val_str.startswith('-') and val_str[1:].replace('.', '', 1).isdigit()):
-                        constraint_values.append(val_str)
-    
-    # Generate boundary values around extracted constraints
-    boundary_tests = []
-    for val in constraint_values:
-        try:
-            num = float(val)
-            is_int = '.' not in val
-            
-            if is_int:
-                boundary_tests.append(str(int(num)))       # Exact
-                boundary_tests.append(str(int(num) + 1))   # Above
-                boundary_tests.append(str(int(num) - 1))   # Below
-            else:
-                boundary_tests.append(str(num))            # Exact
-                boundary_tests.append(str(num + 0.01))     # Slightly above
-                boundary_tests.append(str(num - 0.01))     # Slightly below
-        except:
-            pass
-
-    if param_type == 'float':
-        values = boundary_tests + ["0.0", "100.0", "10.5", "-5.0", "0.01"]
-    elif param_type == 'int':
-        values = boundary_tests + ["0", "1", "10", "100", "-1", "5"]
-    elif param_type == 'str':
-        # Use string literals from code
-        if string_literals:
-            values = [f"'{lit}'" for lit in list(string_literals)[:5]]
-        # Add common edge cases
-        values.extend(["''", "'TestUrun'", "'invalid'", "None"])
-    elif param_type == 'list':
-        # Truly Dynamic Smart Generation for list of dicts
-        extracted_keys = list(func_info.get('dict_keys', [])) if func_info else []
-        
-        if extracted_keys:
-            # Generate dicts dynamically using verified keys from the code
-            # 1. Complete valid dicts
-            dict1 = {k: "test_val" for k in extracted_keys}
-            
-            # Try to be smart about values if keys suggest type (heuristic)
-            for k in extracted_keys:
-                lower_k = k.lower()
-                if any(x in lower_k for x in ['ucret', 'price', 'cost', 'amount', 'salary', 'total']):
-                    dict1[k] = 100
-                elif any(x in lower_k for x in ['gun', 'day', 'count', 'quantity', 'yil', 'year', 'num', 'adet']):
-                    # Fix 12: Safe demand (5)
-                    dict1[k] = 5
-                elif any(x in lower_k for x in ['oncelik', 'priority', 'rank', 'level', 'score']):
-                    dict1[k] = 1 # Safe priority (1-5)
-                elif any(x in lower_k for x in ['stok', 'stock']):
-                     # Fix 12: High supply for list inputs (just in case)
-                     dict1[k] = 100
-                elif any(x in lower_k for x in ['ad', 'name', 'title', 'pozisyon', 'role', 'baslik']):
-                    dict1[k] = "TestUrun"
-            
-            # 2. Edge case values (Zeroes/Negatives for numbers)
-            dict2 = dict1.copy()
-            for k, v in dict2.items():
-                if isinstance(v, (int, float)):
-                    dict2[k] = 0
-            
-            # 3. Missing keys (for error handling/logic checks)
-            dict3 = dict1.copy()
-            if dict3:
-                dict3.pop(list(dict3.keys())[0])
-            
-            # 4. Range Edge Cases (for priority 1-5)
-            dict4 = dict1.copy()
-            for k, v in dict4.items():
-                 # Trigger > 5 failure
-                 if any(x in k.lower() for x in ['oncelik', 'priority']):
-                     dict4[k] = 10 
-            
-            values = [
-                "[]",
-                f"[{dict1}]", 
-                f"[{dict1}, {dict1}]",  # Multiple items
-                f"[{dict2}]",  # Zero logic
-                f"[{dict4}]",  # Out of range logic
-                f"[{dict3}]", # Missing key scenario
-                f"[{dict1}, {dict3}]", # FIX 16: Mixed Valid/Invalid (Loop continues)
-            ]
-        else:
-            # Fallback if no keys found but it's a list
-            values = ["[]", "[1, 2, 3]", "[{'a': 1}, {'b': 2}]", "['a', 'b']"]
-            
-    elif param_type == 'bool':
-        values = ["True", "False"]
-    elif param_type == 'dict':
-        extracted_keys = list(func_info.get('dict_keys', [])) if func_info else []
-        if extracted_keys:
-             dict1 = {k: 1 for k in extracted_keys}
-             values = ["{}", f"{dict1}"]
-        else:
-             values = ["{}", "{'key': 'value'}", "{'id': 1}"]
-    else:
-        values = boundary_tests + ["None", "0", "1", "''", "[]"]
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_values = []
-    for v in values:
-        if v not in seen:
-            seen.add(v)
-            unique_values.append(v)
-
-    return unique_values[:15]  # Limit to 15 values
-
+# Key names repeat across functions and uploads, so each is classified once
+@functools.lru_cache(maxsize=4096)
+def _dict_key_value(key_lower: str) -> Optional[str]:
+    """Sample value for a dict key in _build_dict_from_keys; None for a role/position key."""
+    # Assign values based on key name patterns
+    if _has_any(key_lower, ('ucret', 'price', 'cost', 'salary', 'amount', 'maas')):
+        return "100"  # Consistent price
+    elif _has_any(key_lower, ('gun', 'day', 'count', 'quantity', 'num', 'adet', 'stock', 'stok')):
+        # Fix 12: Safe demand value (5) vs Supply (100)
+        return "5"
+    elif _has_any(key_lower, ('yil', 'year')):
+        return "2020"
+    elif _has_any(key_lower, ('ad', 'name', 'isim')):
+        return "'TestUrun'"  # FIX 15: Standardized Key
+    elif _has_any(key_lower, ('pozisyon', 'role', 'title', 'job')):
+        return None
+    return "'value'"
 
+# Pure functions of the argument name, which repeats across functions and calls
+@functools.lru_cache(maxsize=4096)
 def _get_safe_value(arg_name: str) -> str:
     """Return a safe default value based on argument name."""
     arg_lower = arg_name.lower()
     
     # Files/Paths
-    if any(x in arg_lower for x in ['file', 'path', 'dir', 'folder']): return "'.'"
+    if _has_any(arg_lower, ('file', 'path', 'dir', 'folder')): return "'.'"
     
     # Patterns
-    if any(x in arg_lower for x in ['pattern', 'search', 'query']): return "'.py'"
+    if _has_any(arg_lower, ('pattern', 'search', 'query')): return "'.py'"
     
     # Booleans
-    if any(x in arg_lower for x in ['is_', 'has_', 'enable', 'skip', 'hidden']): return "False"
+    if _has_any(arg_lower, ('is_', 'has_', 'enable', 'skip', 'hidden')): return "False"
     
     # Numbers
-    if any(x in arg_lower for x in ['num', 'count', 'depth', 'limit', 'max', 'min']): return "1"
+    if _has_any(arg_lower, ('num', 'count', 'depth', 'limit', 'max', 'min')): return "1"
     
     # Lists
-    if any(x in arg_lower for x in ['list', 'items', 'arr']): return "[1]"
+    if _has_any(arg_lower, ('list', 'items', 'arr')): return "[1]"
     
     # Default string
     return "'default'"
 
-def _get_edge_values(arg: str) -> list:
-    """Get edge values for a specific argument."""
+@functools.lru_cache(maxsize=4096)
+def _get_edge_values(arg: str) -> tuple:
+    """Get edge values for a specific argument (a shared, cached tuple)."""
     arg_lower = arg.lower()
-    values = []
     
     # CASE 1: File/directory path parameters
-    if any(x in arg_lower for x in ['file', 'path', 'filepath', 'directory', 'dir', 'folder']):
-        values.extend(["'.'", "'/tmp'", "'nonexistent_path'"])
+    if _has_any(arg_lower, ('file', 'path', 'filepath', 'directory', 'dir', 'folder')):
+        return ("'.'", "'/tmp'", "'nonexistent_path'")
     
     # CASE 2: Pattern/search parameters
-    elif any(x in arg_lower for x in ['pattern', 'search', 'query', 'filter', 'keyword']):
-        values.extend(["'.py'", "''"])
+    elif _has_any(arg_lower, ('pattern', 'search', 'query', 'filter', 'keyword')):
+        return ("'.py'", "''")
     
     # CASE 3: Boolean parameters
-    elif any(x in arg_lower for x in ['include', 'skip', 'hidden', 'flag', 'enable']):
-        values.extend(["True", "False"])
+    elif _has_any(arg_lower, ('include', 'skip', 'hidden', 'flag', 'enable')):
+        return ("True", "False")
     
     # CASE 4: Numeric parameters
-    elif any(x in arg_lower for x in ['depth', 'max', 'min', 'limit', 'num', 'int', 'count']):
-        values.extend(["-1", "0", "1", "10"])
+    elif _has_any(arg_lower, ('depth', 'max', 'min', 'limit', 'num', 'int', 'count')):
+        return ("-1", "0", "1", "10")
     
     # CASE 5: List parameters
-    elif any(x in arg_lower for x in ['list', 'arr', 'items']):
-        values.extend(["[]", "[1]"])
+    elif _has_any(arg_lower, ('list', 'arr', 'items')):
+        return ("[]", "[1]")
     
     # FALLBACK
-    else:
-        values.extend(["None", "0", "1", "-1", "''"])
-        
-    return values
+    return ("None", "0", "1", "-1", "''")
 
-def _generate_edge_case_inputs(args: list, func_info: dict = None) -> list:
-    """
-    Generate comprehensive edge case input TUPLES matching the function signature.
-    Returns strings like: "('.', 'pattern', 0)"
-    """
-    edge_cases = []
+# Depends only on the argument names, and signatures repeat across functions and uploads
+@functools.lru_cache(maxsize=4096)
+def _edge_case_inputs(args: tuple) -> tuple:
+    # Insertion-ordered, so the first 15 distinct tuples win as before
+    edge_cases = {}
+    defaults = [_get_safe_value(arg) for arg in args]
+    trailer = ",)" if len(args) == 1 else ")"
     
     # Strategy: Vary one argument at a time with edge values, keep others safe
     for i, target_arg in enumerate(args):
-        edge_vals = _get_edge_values(target_arg)
-        
-        for val in edge_vals:
-            current_args = []
-            for j, other_arg in enumerate(args):
-                if i == j:
-                    current_args.append(val)
-                else:
-                    current_args.append(_get_safe_value(other_arg))
+        for val in _get_edge_values(target_arg):
+            current_args = defaults.copy()
+            current_args[i] = val
             
             # Format as tuple string
-            tuple_str = "(" + ", ".join(current_args)
-            if len(current_args) == 1:
-                tuple_str += ","
-            tuple_str += ")"
-            edge_cases.append(tuple_str)
+            edge_cases["(" + ", ".join(current_args) + trailer] = None
+            # Limit to 15 to prevent slowdown
+            if len(edge_cases) >= 15:
+                return tuple(edge_cases)
     
     # Add a "All Default" case
-    defaults = [_get_safe_value(arg) for arg in args]
     if defaults:
-        d_str = "(" + ", ".join(defaults)
-        if len(defaults) == 1: d_str += ","
-        d_str += ")"
-        edge_cases.append(d_str)
-
-    # Return unique edge cases (limit to 15 to prevent slowdown)
-    return list(dict.fromkeys(edge_cases))[:15]
-
-def _generate_edge_case_params(args: list) -> list:
-    """Generate edge case parameters for parametrize decorator."""
-    return ["test_input"]  # Always use single tuple input for unpacking
-
-def _generate_branch_inputs(args: list, num_branches: int) -> list:
-    """Generate inputs to cover different branch paths."""
-    inputs = []
-    
-    for arg in args:
-        arg_lower = arg.lower()
-        
-        if any(x in arg_lower for x in ['num', 'int', 'n']):
-            # Cover: negative, zero, positive, large
-            inputs.extend(["-5", "0", "5", "100"])
-        elif any(x in arg_lower for x in ['list', 'arr', 'items']):
-            # Cover: empty, single, multiple
-            inputs.extend(["[]", "[1]", "[1, 2, 3, 4, 5]"])
-        elif any(x in arg_lower for x in ['str', 'text']):
-            # Cover: empty, short, long
-            inputs.extend(["''", "'a'", "'hello world'"])
-        else:
-            inputs.extend(["None", "1", "True"])
-    
-    return inputs[:min(num_branches + 2, 6)]  # Limit for speed
-
-def _generate_comprehensive_branch_inputs(args: list, num_branches: int, func_info: dict = None) -> list:
-    """Generate comprehensive inputs to cover all branch paths."""
-    inputs = []
-    
-    for arg in args:
-        arg_lower = arg.lower()
-        
-        # CASE 1: File/directory path parameters
-        if any(x in arg_lower for x in ['file', 'path', 'filepath', 'directory', 'dir', 'folder']):
-            inputs.extend(["'.'", "'..'", "'/tmp'", "'nonexistent'"])
-        
-        # CASE 2: Pattern/search parameters
-        elif any(x in arg_lower for x in ['pattern', 'search', 'query', 'filter', 'keyword', 'ext']):
-            inputs.extend(["'.py'", "'.txt'", "'test'", "''"])
-        
-        # CASE 3: Boolean parameters
-        elif any(x in arg_lower for x in ['include', 'skip', 'hidden', 'flag', 'enable', 'recursive', 'empty', 'comments']):
-            inputs.extend(["True", "False"])
-        
-        # CASE 4: Depth/count/numeric parameters
-        elif any(x in arg_lower for x in ['depth', 'max', 'min', 'limit', 'num', 'int', 'count', 'n', 'level']):
-            inputs.extend(["-1", "0", "1", "5", "10", "100"])
-        
-        # CASE 5: List parameters
-        elif any(x in arg_lower for x in ['list', 'arr', 'items', 'numbers']):
-            inputs.extend(["[]", "[1]", "[1, 2, 3]", "[-1, 0, 1]"])
-        
-        # CASE 6: String parameters
-        elif any(x in arg_lower for x in ['str', 'text', 'name', 'title', 'message', 'code']):
-            inputs.extend(["''", "'test'", "'hello world'"])
-        
-        # FALLBACK
-        else:
-            inputs.extend(["None", "0", "1", "True", "False"])
-    
-    return inputs[:min(num_branches * 2 + 3, 10)]
-
+        edge_cases["(" + ", ".join(defaults) + trailer] = None
 
+    return tuple(edge_cases)
 
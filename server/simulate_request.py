@@ -1,9 +1,18 @@
-
-import requests
+import sys
+import time
 import json
+import httpx
+
+try:
+    import orjson
+except ImportError:  # optional speedup, as in services.gemini_analyzer
+    orjson = None
 
 url = "http://localhost:8000/generate-tests"
 
+# Number of requests to send: python simulate_request.py [N] (default 1)
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+
 # Read the new simulation subject
 with open("simulation_code.py", "r", encoding="utf-8") as f:
     code = f.read()
@@ -14,17 +23,39 @@ payload = {
     "file_name": "stok_yonetimi.py"
 }
 
-try:
-    print("MOCK USER: Sending request to /generate-tests...")
-    response = requests.post(url, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        print("\n--- SUCCESS ---")
-        print(f"Coverage: {data['coverage_estimate']}%")
-        print(f"Explanation: {data['explanation']}")
-        print("\n--- Generated Tests Preview ---")
-        print(data['test_code'][:500] + "...")
-    else:
-        print(f"Error: {response.text}")
-except Exception as e:
-    print(f"Connection Failed: {e}")
+# Encoded once; every run sends the same bytes
+body = orjson.dumps(payload) if orjson else json.dumps(payload).encode("utf-8")
+headers = {"Content-Type": "application/json"}
+
+timings = []
+
+# One client for all runs, so the connection is reused instead of reopened per request.
+# No timeout, like requests.post: AI generation can take a while.
+with httpx.Client(timeout=None) as client:
+    for i in range(runs):
+        try:
+            print(f"MOCK USER: Sending request {i + 1}/{runs} to /generate-tests...")
+            started = time.perf_counter()
+            response = client.post(url, content=body, headers=headers)
+            timings.append(time.perf_counter() - started)
+            if response.status_code == 200:
+                # Only the first response is shown in full
+                if i == 0:
+                    data = orjson.loads(response.content) if orjson else response.json()
+                    print("\n--- SUCCESS ---")
+                    print(f"Coverage: {data['coverage_estimate']}%")
+                    print(f"Explanation: {data['explanation']}")
+                    print("\n--- Generated Tests Preview ---")
+                    print(data['test_code'][:500] + "...")
+            else:
+                print(f"Error: {response.text}")
+        except Exception as e:
+            print(f"Connection Failed: {e}")
+            break
+
+if len(timings) > 1:
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"\n--- Latency over {len(timings)} requests ---")
+    print(f"p50: {p50 * 1000:.1f} ms | p95: {p95 * 1000:.1f} ms | max: {timings[-1] * 1000:.1f} ms")
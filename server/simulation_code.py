@@ -1,45 +1,95 @@
 import json
-import os
+import logging
+from collections import defaultdict
 from datetime import datetime
 
+_LOGGER = logging.getLogger(__name__)
+
 class BildirimServisi:
+    def __init__(self, sink=None):
+        # Any print-like callable taking the finished message; defaults to logging so
+        # test runs don't write to stdout
+        self._sink = sink or (lambda m: _LOGGER.info("%s", m))
+
     def gonder(self, mesaj: str):
-        print(f"Bildirim: {mesaj}")
+        self._sink(f"Bildirim: {mesaj}")
         return True
 
 class GorevYoneticisi:
     def __init__(self, veri_dosyasi: str):
         self.dosya = veri_dosyasi
         self.gorevler = {}
+        # oncelik -> gorev ids, so filtered reports only touch matching tasks
+        self._by_oncelik = defaultdict(list)
         self._yukle()
+        # Next id to hand out; len()+1 would reuse an id once the file has gaps
+        self._next_id = 1 + max((int(k) for k in self.gorevler if str(k).isdigit()), default=0)
 
     def _yukle(self):
-        if os.path.exists(self.dosya):
-            with open(self.dosya, 'r') as f:
+        # JSONL: one record per line, a later line for the same id overrides the earlier one
+        # Just open it - a missing file is the same as an empty one, no separate exists() stat
+        try:
+            f = open(self.dosya, 'r')
+        except FileNotFoundError:
+            return
+        eski_format = False
+        with f:
+            for satir in f:
                 try:
-                    self.gorevler = json.load(f)
-                except:
-                    self.gorevler = {}
+                    kayit = json.loads(satir)
+                except ValueError:
+                    continue
+                if not isinstance(kayit, dict):
+                    continue
+                if "id" in kayit:
+                    gorev_id = kayit.pop("id")
+                    # A non-object legacy value, wrapped by _satir
+                    self.gorevler[gorev_id] = kayit["_deger"] if kayit.keys() == {"_deger"} else kayit
+                else:
+                    # Older stores were one json.dump'ed {id: task} object; migrated below
+                    eski_format = True
+                    self.gorevler.update(kayit)
+        if eski_format:
+            self.kaydet()
+        for gorev_id, detay in self.gorevler.items():
+            # Records without an oncelik are kept and stored, just not indexed
+            if isinstance(detay, dict) and "oncelik" in detay:
+                self._by_oncelik[detay["oncelik"]].append(gorev_id)
+
+    @staticmethod
+    def _satir(gorev_id: str, detay) -> str:
+        kayit = {"id": gorev_id, **detay} if isinstance(detay, dict) else {"id": gorev_id, "_deger": detay}
+        return json.dumps(kayit) + "\n"
+
+    def _ekle_kayit(self, gorev_id: str):
+        # Append only the changed task instead of rewriting the whole file
+        with open(self.dosya, 'a') as f:
+            f.write(self._satir(gorev_id, self.gorevler[gorev_id]))
 
     def kaydet(self):
+        # Full rewrite, also drops superseded lines
         with open(self.dosya, 'w') as f:
-            json.dump(self.gorevler, f)
+            for gorev_id, detay in self.gorevler.items():
+                f.write(self._satir(gorev_id, detay))
 
-    def gorev_ekle(self, baslik: str, oncelik: int = 1):
+    def gorev_ekle(self, baslik: str, oncelik: int = 1, *, _now: str = None):
         if oncelik < 1 or oncelik > 5:
             raise ValueError("Öncelik 1-5 arasında olmalı")
             
         if not baslik:
             raise ValueError("Başlık boş olamaz")
 
-        gorev_id = str(len(self.gorevler) + 1)
+        gorev_id = str(self._next_id)
+        self._next_id += 1
         self.gorevler[gorev_id] = {
             "baslik": baslik,
             "oncelik": oncelik,
             "tamamlandi": False,
-            "tarih": str(datetime.now())
+            # _now pins the timestamp (deterministic tests, no clock call per add)
+            "tarih": _now or datetime.now().isoformat()
         }
-        self.kaydet()
+        self._by_oncelik[oncelik].append(gorev_id)
+        self._ekle_kayit(gorev_id)
         return gorev_id
 
     def gorev_tamamla(self, gorev_id: str, bildirim: BildirimServisi):
@@ -51,7 +101,7 @@ class GorevYoneticisi:
             return "Zaten tamamlanmış"
             
         task["tamamlandi"] = True
-        self.kaydet()
+        self._ekle_kayit(gorev_id)
         
         if bildirim:
             bildirim.gonder(f"{task['baslik']} tamamlandı")
@@ -62,10 +112,6 @@ class GorevYoneticisi:
         if not self.gorevler:
             return []
             
-        sonuc = []
-        for g_id, detay in self.gorevler.items():
-            if filtre_oncelik and detay["oncelik"] != filtre_oncelik:
-                continue
-            sonuc.append(detay)
-            
-        return sonuc
+        if filtre_oncelik:
+            return [self.gorevler[g_id] for g_id in self._by_oncelik.get(filtre_oncelik, ())]
+        return list(self.gorevler.values())
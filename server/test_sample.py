@@ -1,3 +1,5 @@
+import math
+
 def calculate_sum(a, b):
     """Calculate sum of two numbers."""
     if a < 0 or b < 0:
@@ -8,9 +10,4 @@ def factorial(n):
     """Calculate factorial of n."""
     if n < 0:
         raise ValueError("Negative number")
-    if n == 0:
-        return 1
-    result = 1
-    for i in range(1, n + 1):
-        result *= i
-    return result
+    return math.factorial(n)